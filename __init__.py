@@ -1,3 +1,4 @@
+from .source import *
 from .stock import *
 from .make_stocks import *
 from .candlestick import *
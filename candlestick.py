@@ -1,19 +1,27 @@
 import matplotlib.pyplot as plt
 import matplotlib.colors as mcolors
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
 import pandas as pd
 import numpy as np
 import random
-from PIL import Image
+import json
+import io
+import tempfile
+import hashlib
+import re
 from pathlib import Path
 import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
-from Data.stock import FeatureStock
-from Data.utils import candlestick_ochl, volume_overlay, dataframe_empty_handler, increment_path
+from Data.stock import Stock, FeatureStock
+from Data.utils import candlestick_ochl, candle_colors, candle_geometry, volume_overlay, dataframe_empty_handler, \
+    increment_path, trading_dates, TradingDates, PRICE_COLUMNS, ChartRaster, encode_image, figure_image, image_formats, ShardReader, shard_writer, close_shards, \
+    ChartArray, chart_array, close_chart_arrays, load_manifest, manifest_writer, close_manifests
 
 
 class CandlstickChart:
-    def __init__(self, market: str=None, size=None, period=None, linespace=None, candlewidth=None, linewidth=None, style=None, name=None, exist_ok=None, **kwargs) -> None:
+    def __init__(self, market: str=None, size=None, period=None, linespace=None, candlewidth=None, linewidth=None, style=None, name=None, exist_ok=None, panel=False, engine='matplotlib', image_format='png', compress_level=6, output='files', root=Path.cwd(), **kwargs) -> None:
         '''
         size: [width, height]
             the size of chart image
@@ -27,6 +35,24 @@ class CandlstickChart:
             the width of moving averages
         style: str
             plot style of matplotlib (ex. default: white background, dark_style: dark background)
+        panel: bool
+            load historical data from the memory-mapped market panel (see StockPanel)
+        engine: str
+            matplotlib: draw chart with new matplotlib figure and an artist per candle (the same images as existing datasets)
+            pool: reuse matplotlib figure and candle collections of this setting in each process (see ChartFigure).
+                  Some antialiased candle edge pixels differ from matplotlib engine
+            numpy: draw chart straight into numpy buffer (see ChartRaster). It is much faster
+        image_format: str
+            png / webp (lossless) / npy (raw RGB array)
+        compress_level: int
+            png compression, 0 (fastest, largest) ~ 9 (slowest, smallest)
+        output: str
+            files: images/{name}.{format} and pixels/{name}.csv
+            shards: tar shards of image, pixel coordinates and metadata in shards/ (see ShardWriter)
+            memmap: raw images in preallocated array/images.npy and array/meta.npy (see ChartArray, allocate).
+                    pixel coordinates are not saved
+        root: pathlib.Path
+            directory of Stock and Image folders
         '''
         if 'undefined' in kwargs:
             return
@@ -37,15 +63,31 @@ class CandlstickChart:
         self.candlewidth = candlewidth
         self.linewidth = linewidth
         self.style = style
+        self.panel = panel
+        self.engine = engine
+        self.image_format = image_format
+        self.compress_level = compress_level
+        self.output = output
+        self.root = root
+        self.reader = None
+        self.rows = dict()
         self.set_default(**kwargs)
-        self.path = Path(increment_path(Path.cwd() / 'Image' / (f'{size[0]}x{size[1]}' \
+        if engine not in ['matplotlib', 'pool', 'numpy']:
+            raise ValueError(f'unknown engine: {engine}')
+        if output not in ['files', 'shards', 'memmap']:
+            raise ValueError(f'unknown output: {output}')
+        if image_format not in image_formats:
+            raise ValueError(f'unknown image format: {image_format}')
+        # chart geometry (autoscale limits, pixel coordinates) shared by every engine
+        self.raster = ChartRaster(size, period, linespace, candlewidth, linewidth, style, self.feature, self.color)
+        self.path = Path(increment_path(root / 'Image' / (f'{size[0]}x{size[1]}' \
             if not name else name), exist_ok=exist_ok, sep='_'))
         name = self.path.name
         self.path = self.path / self.market
         (self.path / 'images').mkdir(parents=True, exist_ok=True)
         (self.path / 'pixels').mkdir(parents=True, exist_ok=True)
         try:
-            info = pd.read_csv(Path.cwd() / 'Image' / 'info.csv', index_col='Name')
+            info = pd.read_csv(root / 'Image' / 'info.csv', index_col='Name')
         except FileNotFoundError:
             info = pd.DataFrame()
 
@@ -57,6 +99,9 @@ class CandlstickChart:
             'candlewidth': [candlewidth],
             'linewidth': [linewidth],
             'style': [style],
+            'Format': [image_format],
+            'Output': [output],
+            'Engine': [engine],
             'Volume': [self.feature.get('volume')],
             'SMA': ['_'.join(map(str, self.feature.get('SMA')))],
             'EMA': ['_'.join(map(str, self.feature.get('EMA')))],
@@ -69,7 +114,7 @@ class CandlstickChart:
         })
         info = pd.concat([info, new_info.set_index('Name')])
         info = info[~info.index.duplicated(keep='last')]
-        info.to_csv(Path.cwd() / 'Image' / 'info.csv')
+        info.to_csv(root / 'Image' / 'info.csv')
         
     def set_default(
         self,
@@ -116,30 +161,111 @@ class CandlstickChart:
         pixel: bool
             whether to save pixel coordinates. True when making yolo chart
         '''
-        stock = FeatureStock(ticker, self.market, **self.feature)
+        stock = FeatureStock(ticker, self.market, **self.feature, root=self.root, panel=self.panel)
         data = stock.load_data()
-        dates = data.index.tolist()
-        trade_index = dates.index(last_date)
-        start_index = trade_index - self.period + 1
+        window = trading_dates(data.index).window(last_date, self.period)
         
-        if start_index < 0:
+        if window is None:
             return
         
-        start = dates[start_index]
-        c = data.loc[start:last_date]
+        c = data.iloc[window[0]:window[1]]
+        try:
+            image = self.draw(c)
+            coordinates = self.raster.pixels(c) if pixel and self.output != 'memmap' else None
+            self.save_chart(ticker, last_date, c, image, coordinates)
+        except Exception:
+            self.fail_chart(ticker, last_date)
+            raise
+    
+    def make_charts(self, ticker, start='2006', end='a', pixel=True):
+        '''
+        make charts of every last date (start <= last date < end) of the ticker
+        Historical data is loaded once, and limits and pixel coordinates of every window
+        are computed at once with sliding window operations (numpy engine also draws a batch of windows at once)
+        start, end: str
+            range of last dates (compared as string, ex. '2006' <= '2006-01-02' < 'a')
+        '''
+        stock = FeatureStock(ticker, self.market, **self.feature, root=self.root, panel=self.panel)
+        data = stock.load_data()
+        if data.empty:
+            return
+        
+        dates = trading_dates(data.index)
+        positions = dates.between(start, end)
+        ends = np.arange(max(positions.start, self.period - 1), positions.stop)
+        if not len(ends):
+            return
+        
+        limits = self.raster.batch_limits(data, ends)
+        pixel = pixel and self.output != 'memmap'
+        pixels = self.raster.batch_pixels(data, ends, limits) if pixel else None
+        images = self.draw_charts(data, ends, limits)
+        for k, i in enumerate(ends.tolist()):
+            c = data.iloc[i - self.period + 1:i + 1]
+            try:
+                image = next(images)
+                self.save_chart(ticker, dates.date(i), c, image, pixels[k] if pixel else None)
+            except Exception:
+                self.fail_chart(ticker, dates.date(i))
+                raise
+    
+    def draw_charts(self, data: pd.DataFrame, ends: np.ndarray, limits: list):
+        '''
+        images of the windows of data which end at ends, one by one (see draw)
+        numpy engine draws ChartRaster.batch windows at once
+        '''
+        if self.engine == 'numpy':
+            batch = self.raster.batch
+            for i in range(0, len(ends), batch):
+                yield from self.raster.batch_draw(data, ends[i:i + batch], limits[i:i + batch])
+        else:
+            for k, i in enumerate(ends.tolist()):
+                yield self.draw(data.iloc[i - self.period + 1:i + 1], limits[k])
+    
+    def draw(self, c: pd.DataFrame, limits: list=None) -> np.ndarray:
+        '''
+        draw chart with the engine
+        c: pd.DataFrame
+            historical data and features of the chart period
+        limits: list
+            precomputed limits of each subplot (see ChartRaster.batch_limits). If None, autoscale to c
         
+        return: np.ndarray
+            uint8 RGB image [height, width, 3]
+        '''
+        if self.engine == 'numpy':
+            return self.rasterize(c, limits)
+        elif self.engine == 'pool':
+            return self.plot_pooled(c, limits)
+        return self.plot(c)
+    
+    def rasterize(self, c: pd.DataFrame, limits: list=None) -> np.ndarray:
+        '''
+        draw chart with numpy rasterizer
+        '''
+        image, _ = self.raster.draw(c, limits)
+        return image
+    
+    def plot_pooled(self, c: pd.DataFrame, limits: list=None) -> np.ndarray:
+        '''
+        draw chart with the pooled matplotlib figure of this setting
+        '''
+        figure = chart_figure(self)
+        figure.update(c, limits)
+        return figure.image()
+    
+    def plot(self, c: pd.DataFrame) -> np.ndarray:
+        '''
+        draw chart with new matplotlib figure
+        Candles are drawn one artist each, so images are the same as existing datasets
+        '''
         plt.style.use(self.style)
         num, ax = subplots(self.feature.get('volume'), self.feature.get('MACD'))
         fig = plt.figure(figsize=(self.size[0]/100, self.size[1]/100))
         ax1 = fig.add_subplot(ax[0])  # subplot of candlestick and moving averages
         
         # remove grid, labels, axis, padding
-        ax1.grid(False)
-        ax1.set_xticklabels([])
-        ax1.set_yticklabels([])
-        ax1.xaxis.set_visible(False)
-        ax1.yaxis.set_visible(False)
-        ax1.axis('off')
+        hide_axis(ax1)
         plt.tight_layout(pad=0)
         fig.set_constrained_layout_pads(w_pad=0, h_pad=0)
         
@@ -174,42 +300,269 @@ class CandlstickChart:
                 colorup=self.color.get('up'), colordown=self.color.get('down'), alpha=None,
             )
             ax2.add_collection(bc)
-            ax2.grid(False)
-            ax2.set_xticklabels([])
-            ax2.set_yticklabels([])
-            ax2.xaxis.set_visible(False)
-            ax2.yaxis.set_visible(False)
-            ax2.axis('off')
+            hide_axis(ax2)
         
         if not 0 in self.feature.get('MACD'):
             ax3 = fig.add_subplot(ax[num])
             ax3.plot(c['MACD'], linewidth=1, color=self.color.get('MACD')[0], alpha=None)
             ax3.plot(c['MACD_Signal'], linewidth=1, color=self.color.get('MACD')[1], alpha=None)
-            ax3.grid(False)
-            ax3.set_xticklabels([])
-            ax3.set_yticklabels([])
-            ax3.xaxis.set_visible(False)
-            ax3.yaxis.set_visible(False)
-            ax3.axis('off')
+            hide_axis(ax3)
+        
+        image = figure_image(fig)
+        plt.close(fig)
+        return image
+
+    def save_chart(self, ticker, last_date, c: pd.DataFrame, image: np.ndarray, coordinates: np.ndarray=None):
+        '''
+        encode image once and save it with pixel coordinates
+        files: images/{name}.{format} and pixels/{name}.csv
+        shards: one sample of tar shards (see ShardWriter)
+        memmap: the allocated row of chart array without encoding (see allocate)
+        
+        coordinates: np.ndarray
+            [period, (Xmin, Ymin, Xmax, Ymax)] of each candle (see ChartRaster.pixels). If None, not saved
+        '''
+        if self.output == 'memmap':
+            chart_array(self.path / 'array').write(self.row(ticker, last_date), image, ticker, last_date)
+            manifest_writer(self.path / 'manifest').write(ticker, last_date, self.config_hash(), image.nbytes)
+            return
         
         name = f'{ticker}_{last_date}'
-        fig.savefig(self.path / 'images' / f'{name}.png')
-        pil_image = Image.open(self.path / 'images' / f'{name}.png')
-        rgb_image = pil_image.convert('RGB')
-        rgb_image.save(self.path / 'images' / f'{name}.png')
+        data = encode_image(image, self.image_format, self.compress_level)
+        pixel_coordinates = None
+        if coordinates is not None:
+            pixel_coordinates = pd.DataFrame(
+                coordinates, columns=['Xmin', 'Ymin', 'Xmax', 'Ymax'], index=pd.Index(c.index, name='Date')
+            )
         
-        if pixel:
-            pixel_coordinates = get_pixel(self.size, lines, patches, fig, c)
-            pixel_coordinates.to_csv(self.path / 'pixels' / f'{name}.csv')
-
+        if self.output == 'shards':
+            meta = {
+                'ticker': ticker, 'last_date': last_date, 'market': self.market,
+                'size': list(self.size), 'period': self.period, 'format': self.image_format,
+            }
+            members = {self.image_format: data, 'json': json.dumps(meta).encode()}
+            if pixel_coordinates is not None:
+                members['pixels.csv'] = pixel_coordinates.to_csv().encode()
+            shard_writer(self.path / 'shards').write(name, members)
+        else:
+            (self.path / 'images' / f'{name}.{self.image_format}').write_bytes(data)
+            if pixel_coordinates is not None:
+                pixel_coordinates.to_csv(self.path / 'pixels' / f'{name}.csv')
+        manifest_writer(self.path / 'manifest').write(ticker, last_date, self.config_hash(), len(data))
+    
+    def fail_chart(self, ticker, last_date):
+        '''
+        record the chart as failed in manifest. It is made again when resumed
+        '''
+        manifest_writer(self.path / 'manifest').write(ticker, last_date, self.config_hash(), 0, status='failed')
+    
+    def config_hash(self) -> str:
+        '''
+        hash of the chart setting which changes chart images
+        '''
+        config = repr((
+            list(map(int, self.size)), int(self.period), float(self.linespace), float(self.candlewidth),
+            float(self.linewidth), self.style, self.feature, self.color, self.image_format, self.engine,
+        ))
+        return hashlib.md5(config.encode()).hexdigest()[:12]
+    
+    def done_charts(self) -> set:
+        '''
+        (ticker, last date) of charts recorded in manifest as done with the current chart setting
+        The saved chart must still have the size in manifest (a deleted or truncated image is made again).
+        For memmap output, the chart must be in the chart array
+        '''
+        manifest = load_manifest(self.path / 'manifest')
+        manifest = manifest[(manifest['Status'] == 'done') & (manifest['Config'] == self.config_hash())]
+        if self.output == 'memmap':
+            done = set(zip(manifest['Ticker'], manifest['Date']))
+            if not done or not (self.path / 'array' / 'meta.npy').exists():
+                return set()
+            meta = self.chart_array().meta
+            return done & set(zip(meta['Ticker'].tolist(), meta['Date'].tolist()))
+        
+        if self.has_shards():
+            self.shards().load()
+        shard_sizes = dict()
+        def saved(ticker, last_date, size):
+            name = f'{ticker}_{last_date}'
+            file = self.path / 'images' / f'{name}.{self.image_format}'
+            if file.exists():
+                return file.stat().st_size == size
+            if not self.has_shards() or (name, self.image_format) not in self.shards():
+                return False
+            shard, offset, member_size = self.shards().locate(name, self.image_format)
+            if shard not in shard_sizes:
+                tar = self.path / 'shards' / shard
+                shard_sizes[shard] = tar.stat().st_size if tar.exists() else 0
+            return member_size == size and offset + size <= shard_sizes[shard]
+        
+        return {
+            (ticker, last_date) for ticker, last_date, size in manifest[['Ticker', 'Date', 'Size']].itertuples(index=False)
+            if saved(ticker, last_date, size)
+        }
+    
+    def allocate(self, tickers, start='2006', end='a', exist_ok=False):
+        '''
+        Preallocate chart array (memmap output) for every chart of tickers (start <= last date < end)
+        Rows of each ticker are kept in self.rows, so the chart can be sent to other processes.
+        A row whose chart is not drawn (see chart_dates) stays empty
+        exist_ok: bool
+            keep the existing chart array if it has the same shape and every written row is
+            the chart allocated to it (resume). Otherwise the manifest of the old array is removed
+        '''
+        count = 0
+        self.rows = dict()
+        rows = [np.empty((0, 2), dtype='U10')]  # (ticker, last date) of each row
+        for ticker in tickers:
+            dates, ends = self.chart_ends(ticker, start, end)
+            last_dates = dates.labels[ends.start:ends.stop]
+            self.rows[ticker] = (count, last_dates)
+            count += len(ends)
+            if len(ends):
+                rows.append(np.stack(np.broadcast_arrays(ticker, last_dates), axis=1))
+        rows = np.concatenate(rows).astype('U10')
+        shape = (count, self.size[1], self.size[0], 3)
+        if exist_ok and (self.path / 'array' / 'images.npy').exists():
+            array = self.chart_array()
+            if array.images.shape == shape:
+                meta = np.stack([array.meta['Ticker'], array.meta['Date']], axis=1)
+                written = meta[:, 0] != ''
+                if (meta[written] == rows[written]).all():
+                    return count
+            del array
+        close_chart_arrays()  # rows opened for writing in this process are gone
+        ChartArray.create(self.path / 'array', count, self.size)
+        for file in (self.path / 'manifest').glob('*.csv'):  # charts of the old array are gone
+            file.unlink()
+        return count
+    
+    def chart_ends(self, ticker, start='2006', end='a'):
+        '''
+        trade dates of the ticker and positions of last dates of its charts (start <= last date < end)
+        return: (TradingDates, range). (None, empty range) if there is no historical data
+        '''
+        dates = self.chart_dates(ticker)
+        if not len(dates):
+            return None, range(0)
+        positions = dates.between(start, end)
+        return dates, range(max(positions.start, self.period - 1), max(positions.stop, self.period - 1))
+    
+    def chart_dates(self, ticker) -> TradingDates:
+        '''
+        trade dates of the rows of the ticker which make_charts draws, from raw historical data
+        Features are not computed, so the parent process splits charts quickly.
+        Rows with zero or missing prices (volume) are dropped like convert_feature_format,
+        and so are the first rows without SMA, and the first row whose MACD is 0
+        '''
+        data = Stock(ticker, self.market, root=self.root, panel=self.panel).load_data()
+        columns = PRICE_COLUMNS + (['Volume'] if self.feature['volume'] else [])
+        values = data[columns].to_numpy(dtype=np.float64)
+        drawn = ((values != 0) & ~np.isnan(values)).all(axis=1)
+        drawn[:max(self.feature['SMA'], default=1) - 1] = False
+        if 0 not in self.feature['MACD']:
+            drawn[:1] = False
+        return TradingDates(data.index[drawn])
+    
+    def chunks(self, tickers, start='2006', end='a', size=500, done=None) -> list:
+        '''
+        Split charts of tickers into chunks of at most size charts
+        done: set
+            (ticker, last date) of charts to skip (see done_charts)
+        return: list
+            [(ticker, start, end, count)], largest first. start and end are arguments of make_charts
+        '''
+        chunks = list()
+        for ticker in tickers:
+            dates, ends = self.chart_ends(ticker, start, end)
+            for i, j in self.missing_runs(ticker, dates, ends, done):
+                for k in range(i, j, size):
+                    l = min(k + size, j)
+                    chunks.append((ticker, dates.date(k), dates.date(l) if l < len(dates) else end, l - k))
+        return sorted(chunks, key=lambda chunk: -chunk[3])
+    
+    @staticmethod
+    def missing_runs(ticker, dates, ends: range, done=None) -> list:
+        '''
+        [start, end) position ranges of consecutive charts which are not done
+        '''
+        if not done:
+            return [(ends.start, ends.stop)] if len(ends) else []
+        missing = np.array([(ticker, date) not in done for date in dates.labels[ends.start:ends.stop].tolist()], dtype=bool)
+        edges = np.diff(np.concatenate([[False], missing, [False]]).astype(np.int8))
+        starts = np.flatnonzero(edges == 1) + ends.start
+        stops = np.flatnonzero(edges == -1) + ends.start
+        return list(zip(starts.tolist(), stops.tolist()))
+    
+    def row(self, ticker, last_date) -> int:
+        '''
+        row of chart array for the chart of ticker ending at last_date
+        '''
+        start, last_dates = self.rows.get(ticker, (0, np.empty(0, dtype='U10')))
+        i = int(np.searchsorted(last_dates, last_date))
+        if i == len(last_dates) or last_dates[i] != last_date:
+            raise ValueError(f'chart of {ticker} at {last_date} is not allocated (see allocate)')
+        return start + i
+    
+    def chart_array(self) -> ChartArray:
+        '''
+        chart array (memmap output) opened read only
+        '''
+        return ChartArray(self.path / 'array')
+    
+    def close(self):
+        '''
+        Close shards, chart arrays and manifest written by this process
+        '''
+        close_shards()
+        close_chart_arrays()
+        close_manifests()
+    
+    def shards(self) -> ShardReader:
+        if self.reader is None:
+            self.reader = ShardReader(self.path / 'shards')
+        return self.reader
+    
+    def has_shards(self) -> bool:
+        return (self.path / 'shards').exists()
+    
     def load_pixel_coordinates(self, ticker, last_date):
+        '''
+        Read pixels/{name}.csv, or the sample in shards if there is no file
+        '''
         name = f'{ticker}_{last_date}'
-        pixel_coordinates = pd.read_csv(self.path / 'pixels' / f'{name}.csv', index_col='Date')
+        file = self.path / 'pixels' / f'{name}.csv'
+        if not file.exists() and self.has_shards():
+            file = io.BytesIO(self.shards().read(name, 'pixels.csv'))
+        pixel_coordinates = pd.read_csv(file, index_col='Date')
         return pixel_coordinates
+    
+    def load_chart(self, ticker, last_date) -> bytes:
+        '''
+        encoded chart image from images folder or shards
+        '''
+        name = f'{ticker}_{last_date}'
+        file = self.path / 'images' / f'{name}.{self.image_format}'
+        if not file.exists() and self.has_shards():
+            return self.shards().read(name, self.image_format)
+        return file.read_bytes()
 
     def load_chart_path(self, ticker, last_date):
+        '''
+        path of chart image. A chart in shards is extracted to a temporary directory
+        keyed by its shard and offset, so a chart written again is extracted again
+        '''
         name = f'{ticker}_{last_date}'
-        return self.path / 'images' / f'{name}.png'
+        file = self.path / 'images' / f'{name}.{self.image_format}'
+        if file.exists() or not self.has_shards():
+            return file
+        shard, offset, _ = self.shards().locate(name, self.image_format)
+        extracted = Path(tempfile.gettempdir()) / 'charts' / self.path.parent.name / self.market / \
+            f'{shard[:-len(".tar")]}-{offset}' / file.name
+        if not extracted.exists():
+            extracted.parent.mkdir(parents=True, exist_ok=True)
+            extracted.write_bytes(self.shards().read(name, self.image_format))
+        return extracted
 
 
 class CNNChart(CandlstickChart):
@@ -263,32 +616,140 @@ def subplots(volume, MACD):
     return count, ax
 
 
-def get_pixel(size, lines, patches, fig, stock):
-    height = size[1]
-    xmin, xmax, ymin, ymax = [[] for _ in range(4)]
+def hide_axis(ax):
+    '''
+    remove grid, labels, axis of subplot
+    '''
+    ax.grid(False)
+    ax.set_xticklabels([])
+    ax.set_yticklabels([])
+    ax.xaxis.set_visible(False)
+    ax.yaxis.set_visible(False)
+    ax.axis('off')
 
-    for i in range(len(stock)):
-        bbox_x = patches[i].get_window_extent(fig.canvas.get_renderer())
-        bbox_y = lines[i].get_window_extent(fig.canvas.get_renderer())
-        xmin.append(bbox_x.x0)
-        ymin.append(height-bbox_y.y1)
-        xmax.append(bbox_x.x1)
-        ymax.append(height-bbox_y.y0)
 
-    dates = stock.index.tolist()
+class ChartFigure:
+    def __init__(self, chart: CandlstickChart) -> None:
+        '''
+        matplotlib figure and artists of a chart setting
+        They are made once and only their data and limits are updated for each chart.
+        The figure is not registered in pyplot, so it is freed with this object
+        '''
+        self.style = chart.style
+        self.raster = chart.raster  # autoscale limits
+        self.up = chart.color.get('up')
+        self.down = chart.color.get('down')
+        self.t = np.arange(1, chart.period * chart.linespace+1, chart.linespace)
+        self.offset = chart.candlewidth / 2
+        self.columns = [f'{span}SMA' for span in chart.feature.get('SMA')] + \
+            [f'{span}EMA' for span in chart.feature.get('EMA')]
+        
+        with plt.style.context(self.style):
+            self.fig = Figure(figsize=(chart.size[0]/100, chart.size[1]/100))
+            FigureCanvasAgg(self.fig)
+            num, ax = subplots(chart.feature.get('volume'), chart.feature.get('MACD'))
+            ax1 = self.fig.add_subplot(ax[0])
+            hide_axis(ax1)
+            self.fig.tight_layout(pad=0)
+            self.axes = [ax1]
+            
+            quotes = np.zeros((chart.period, 5))
+            quotes[:, 0] = self.t
+            self.lines, self.patches = candlestick_ochl(
+                ax1, quotes, width=chart.candlewidth, colorup=self.up, colordown=self.down, alpha=None, collection=True
+            )
+            colors = chart.color.get('SMA')[:len(chart.feature.get('SMA'))] + \
+                chart.color.get('EMA')[:len(chart.feature.get('EMA'))]
+            self.averages = [
+                ax1.plot(np.full(chart.period + 1, np.nan), linewidth=chart.linewidth, color=color, alpha=None)[0]
+                for color in colors
+            ]
+            
+            self.bars = None
+            if chart.feature.get('volume'):
+                ax2 = self.fig.add_subplot(ax[1])
+                zeros = np.zeros(chart.period)
+                self.bars = volume_overlay(
+                    ax2, zeros, zeros, zeros, width=1, colorup=self.up, colordown=self.down, alpha=None,
+                )
+                hide_axis(ax2)
+                self.axes.append(ax2)
+            
+            self.MACD = []
+            if not 0 in chart.feature.get('MACD'):
+                ax3 = self.fig.add_subplot(ax[num])
+                self.MACD = [
+                    ax3.plot(np.full(chart.period, np.nan), linewidth=1, color=color, alpha=None)[0]
+                    for color in chart.color.get('MACD')[:2]
+                ]
+                hide_axis(ax3)
+                self.axes.append(ax3)
+    
+    def update(self, c: pd.DataFrame, limits: list=None):
+        '''
+        set artists and limits to the chart period
+        limits: list
+            precomputed limits of each subplot. If None, autoscale to c
+        '''
+        open = c['Open'].to_numpy(dtype=np.float64)
+        close = c['Close'].to_numpy(dtype=np.float64)
+        high = c['High'].to_numpy(dtype=np.float64)
+        low = c['Low'].to_numpy(dtype=np.float64)
+        
+        colors = candle_colors(open, close, self.up, self.down)
+        segments, verts = candle_geometry(self.t[:len(c)], open, close, high, low, self.offset)
+        self.lines.set_segments(segments)
+        self.lines.set_color(colors)
+        self.patches.set_verts(verts)
+        self.patches.set_facecolor(colors)
+        self.patches.set_edgecolor(colors)
+        
+        for line, column in zip(self.averages, self.columns):
+            line.set_ydata(np.concatenate([[np.nan], c[column].to_numpy(dtype=np.float64)]))
+        
+        if self.bars is not None:
+            volume = c['Volume'].to_numpy(dtype=np.float64)
+            x = np.arange(len(c))
+            bars = np.stack([
+                np.stack([x - 0.5, np.zeros(len(c))], axis=1), np.stack([x - 0.5, volume], axis=1),
+                np.stack([x + 0.5, volume], axis=1), np.stack([x + 0.5, np.zeros(len(c))], axis=1),
+            ], axis=1)
+            self.bars.set_verts(bars)
+            self.bars.set_facecolors(np.where(open < close, self.up, self.down).tolist())
+        
+        for line, column in zip(self.MACD, ['MACD', 'MACD_Signal']):
+            line.set_ydata(c[column].to_numpy(dtype=np.float64))
+        
+        limits = limits if limits else self.raster.limits(c)
+        for ax, (xlim, ylim) in zip(self.axes, limits):
+            ax.set_xlim(xlim)
+            ax.set_ylim(ylim)
+    
+    def image(self) -> np.ndarray:
+        '''
+        render figure as RGB image
+        '''
+        with plt.style.context(self.style):
+            return figure_image(self.fig)
 
-    df = pd.DataFrame({
-        'Date': dates,
-        'Xmin': xmin, 'Ymin': ymin,
-        'Xmax': xmax, 'Ymax': ymax
-    })
-    df.set_index('Date', inplace=True)
-    return df
+
+figures = dict()  # pooled chart figures of this process
+def chart_figure(chart: CandlstickChart) -> ChartFigure:
+    '''
+    ChartFigure of the chart setting. It is made once per process
+    '''
+    key = repr((
+        chart.size, chart.period, chart.linespace, chart.candlewidth, chart.linewidth,
+        chart.style, chart.feature, chart.color,
+    ))
+    if key not in figures:
+        figures[key] = ChartFigure(chart)
+    return figures[key]
 
 
 @dataframe_empty_handler
-def get_config(name):
-    info = pd.read_csv(Path.cwd() / 'Image' / 'info.csv', index_col='Name')
+def get_config(name, root=Path.cwd()):
+    info = pd.read_csv(root / 'Image' / 'info.csv', index_col='Name', dtype={'SMA': str, 'EMA': str, 'MACD': str})
     raw = info.loc[name]
     config = raw.replace(np.nan, '')
     size = list(map(int, config['Size'].split('x')))
@@ -298,14 +759,17 @@ def get_config(name):
     linewidth = float(config['linewidth'])
     style = config['style']
     volume = bool(config['Volume'])
-    SMA = list(map(int, list(filter(None, config['SMA'].split(',')))))
-    EMA = list(map(int, list(filter(None, config['EMA'].split(',')))))
-    MACD = list(map(int, list(filter(None, config['MACD'].split(',')))))
+    SMA = list(map(int, list(filter(None, re.split('[_,]', config['SMA'])))))
+    EMA = list(map(int, list(filter(None, re.split('[_,]', config['EMA'])))))
+    MACD = list(map(int, list(filter(None, re.split('[_,]', config['MACD'])))))
     UpColor = config['UpColor']
     DownColor = config['DownColor']
-    SMAColor = list(filter(None, config['SMAColor'].split(',')))
-    EMAColor = list(filter(None, config['EMAColor'].split(',')))
-    MACDColor = list(filter(None, config['MACDColor'].split(',')))
+    SMAColor = list(filter(None, re.split('[_,]', config['SMAColor'])))
+    EMAColor = list(filter(None, re.split('[_,]', config['EMAColor'])))
+    MACDColor = list(filter(None, re.split('[_,]', config['MACDColor'])))
+    image_format = config.get('Format', '') or 'png'
+    output = config.get('Output', '') or 'files'
+    engine = config.get('Engine', '') or 'matplotlib'
     
     config_dict = {
         'size': size,
@@ -322,6 +786,9 @@ def get_config(name):
         'DownColor': DownColor,
         'SMAColor': SMAColor,
         'EMAColor': EMAColor,
-        'MACDColor': MACDColor
+        'MACDColor': MACDColor,
+        'image_format': image_format,
+        'output': output,
+        'engine': engine,
     }
     return config_dict
\ No newline at end of file
@@ -0,0 +1,31 @@
+from pathlib import Path
+import argparse
+import sys
+p = Path.absolute(Path.cwd().parent)
+sys.path.append(str(p))
+from Data.stock import convert_stocks
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument(
+        '--market', '-m', nargs='+', type=str, dest='market', default=['Kospi', 'kosdaq'],
+        help='You can input a list of under options\n' + \
+             'KOSPI: Stock market includes KOSPI only\n' + \
+             'KOSDAQ: Stock market includes KOSDAQ only\n' + \
+             'KONEX: Stock market includes KONEX only'
+    )
+    parser.add_argument(
+        '--format', '-f', type=str, dest='fmt', default='npz', choices=['npz', 'parquet'],
+        help='npz: numpy arrays (no extra package)\n' + \
+             'parquet: parquet file (pyarrow is required)'
+    )
+    parser.add_argument(
+        '--remove', action='store_true', help='remove csv files after converting'
+    )
+    parser.add_argument(
+        '--root', '-r', type=str, default=str(Path.cwd()), help='Root Directory of Stock'
+    )
+    args = parser.parse_args()
+
+    for market in args.market:
+        convert_stocks(market, args.fmt, Path(args.root), args.remove)
@@ -21,14 +21,13 @@ Dataset
 from pathlib import Path
 import pandas as pd
 import random
-import shutil
 from typing import List
 import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
 from Data.labeling import CNNLabeling, YoloLabeling
 from Data.candlestick import CandlstickChart, CNNChart, YoloChart, get_config
-from Data.utils import increment_path, between, dataframe_empty_handler
+from Data.utils import increment_path, between, dataframe_empty_handler, gather_charts
 import warnings
 warnings.filterwarnings("ignore")
 
@@ -63,10 +62,9 @@ class Dataset:
         pass
     
     def move_image(self, ticker, last_date, save_dir):
-        img_from = self.chart.load_chart_path(ticker, last_date)
-        img_to = save_dir / img_from.name
+        img_to = save_dir / f'{ticker}_{last_date}.{self.chart.image_format}'
         try:
-            shutil.copyfile(img_from, img_to)
+            img_to.write_bytes(self.chart.load_chart(ticker, last_date))  # from images folder or shards
         except FileNotFoundError:
             return
 
@@ -162,6 +160,13 @@ class CNNDataset(Dataset):
         '''
         move image from Image folder to Dataset folder
         '''
+        if self.chart.output == 'memmap':  # save_dir/images.npy and meta.npy with labels
+            charts = self.chart.chart_array()
+            rows = charts.rows(labeling['Ticker'], labeling['Date'])
+            found = rows >= 0
+            gather_charts(charts, rows[found], save_dir, labeling['Label'].astype(int).values[found])
+            return
+        
         for row in labeling.to_dict('records'):
             ticker = row['Ticker']
             last_date = row['Date']
@@ -32,10 +32,11 @@ import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
 from Data.stock import Stock
-from Data.utils import dataframe_empty_handler, Bullish, Bearish
+from Data.utils import dataframe_empty_handler, trading_dates, Bullish, Bearish, LabelStore
 from Data.minmax_labeling import minmax_labeling
-from Data.pattern_labeling import pattern_labeling
+from Data.pattern_labeling import pattern_hit_table, window_pattern_labeling
 from Data.merge_labeling import merge_labeling
+from Data.percent_labeling import percent_labeling, percent_threshold
 from Data.candlestick import get_config
 
 
@@ -80,11 +81,13 @@ class Labeling:
     
 
 class CNNLabeling(Labeling):
-    def __init__(self, market, period=20, interval=5, method='4%_01_2', **kwargs) -> None:
+    def __init__(self, market, period=20, interval=5, method='4%_01_2', fmt=None, **kwargs) -> None:
         '''
         interval: int
             forecast interval
             predict n interval after the last input period
+        fmt: str
+            format of labeling partitions, npz / parquet / csv (see LabelStore)
         
         Method
         1. n%_01_2
@@ -94,58 +97,75 @@ class CNNLabeling(Labeling):
         super().__init__(market, method, period)
         self.path = self.path / 'CNN' / self.market / self.method
         self.interval = interval
+        self.fmt = fmt
         self.path.mkdir(parents=True, exist_ok=True)
        
     def process_labeling(self, ticker, start='2006', end='a'):
         super().process_labeling(ticker, start, end)
-        stock = Stock(ticker, self.market)
-        data = stock.load_data()
-        dates = data.index.tolist()
-        last_dates = [d for d in dates if (d >= start) & (d < end)]
+        self.process_labelings([ticker], start, end)
+    
+    def process_labelings(self, tickers, start='2006', end='a', methods=None, intervals=None):
+        '''
+        n%_01_2 labeling of every last date (start <= last date < end) of tickers (see percent_labeling)
+        Historical data of each ticker is loaded once for every method and interval,
+        and only the partition of each ticker is written (see label_store)
+        methods: list
+            n%_01_2 methods (ex. ['4%_01_2', '2%_01_2']). If None, [self.method]
+        intervals: list
+            forecast intervals. If None, [self.interval]
+        '''
+        methods = methods if methods else [self.method]
+        intervals = intervals if intervals else [self.interval]
+        stores = {
+            (interval, percent_threshold(method)): self.label_store(method, interval)
+            for method in methods for interval in intervals
+        }
+        self.labels = [0, 1]
+        for store in stores.values():
+            legacy = store.path.parent / f'{store.path.name}.csv'  # single csv file of old version
+            if legacy.exists():
+                store.migrate(legacy)
         
-        rows = [self.load_labeling()]
-        for last_date in last_dates:
-            i = dates.index(last_date)
-            section = data.iloc[i - self.period + 1: i + 1, :]  # trading(input) data
-            try:
-                forecast = data.iloc[i + self.interval, :]  # forecast answer data
-            except IndexError:
-                break
-            
-            starting = 0
-            endvalue = 0
-            label = ""
-            
-            if len(section) == self.period:
-                if self.method[1:] == "%_01_2":
-                    self.labels = [0, 1]
-                    starting = section.loc[last_date, 'Close']
-                    endvalue = forecast['Close']
-                    
-                    if endvalue >= (1 + (int(self.method[0])/100)) * starting:
-                        label = 1
-                    elif endvalue < starting:
-                        label = 0
-                    else:
-                        continue
-
-                else:
-                    return
-                
-                row = pd.DataFrame({
-                    'Date': [last_date],
-                    'Ticker': [ticker],
-                    'Label': [label]
-                })
-                rows.append(row)
-            
-        labeling = pd.concat(rows)
-        labeling.to_csv(self.path / f'labeling_{self.period}_{self.interval}.csv', index=False)
+        for ticker in tickers:
+            data = Stock(ticker, self.market).load_data()
+            if data.empty:
+                continue
+            positions = trading_dates(data.index).between(start, end)
+            for param, labeling in percent_labeling(data, ticker, positions, self.period, list(stores)).items():
+                store = stores[param]
+                if (store.path / f'{ticker}.{store.fmt}').exists():  # keep labels out of start ~ end
+                    labeling = pd.concat([store.read(ticker).astype({'Label': np.int64}), labeling])
+                    labeling = labeling.drop_duplicates(subset=['Date'], keep='last')
+                store.write(ticker, labeling)
+    
+    def label_store(self, method=None, interval=None) -> LabelStore:
+        '''
+        labeling partitioned by ticker (Labeling/CNN/{market}/{method}/labeling_{period}_{interval})
+        '''
+        method = method if method else self.method
+        interval = interval if interval else self.interval
+        return LabelStore(self.path.parent / method / f'labeling_{self.period}_{interval}', self.fmt)
     
     @dataframe_empty_handler
-    def load_labeling(self, offset=1):
+    def load_labeling(self, offset=1, start=None, end=None, columns=None):
+        '''
+        labeling of every ticker as str
+        offset: int
+            use every offset-th row
+        start, end: str
+            read only start <= Date < end (compared as string, ex. '2006' <= '2006-01-02' < 'a')
+        columns: list
+            read only the columns (Date, Ticker, Label)
+        '''
         super().load_labeling()
-        labeling = pd.read_csv(self.path / f'labeling_{self.period}_{self.interval}.csv', index_col=False, dtype=str)
+        store = self.label_store()
+        if store.exists():
+            labeling = store.load(start, end, columns).astype(str)
+        else:  # single csv file of old version
+            labeling = pd.read_csv(self.path / f'labeling_{self.period}_{self.interval}.csv', index_col=False, dtype=str)
+            if start or end:
+                labeling = labeling[(labeling['Date'] >= (start or '')) & (labeling['Date'] < (end or 'a'))]
+            labeling = labeling[columns if columns else labeling.columns].reset_index(drop=True)
         index = labeling.index.tolist()
         offset_index = list(range(index[0], index[-1] + 1, offset))
         offset_labeling = labeling[labeling.index.isin(offset_index)]
@@ -169,11 +189,14 @@ class YoloLabeling(Labeling):
         super().process_labeling(ticker, start, end)
         stock = Stock(ticker, self.market)
         data = stock.load_data()
-        dates = data.index.tolist()
-        last_dates = [d for d in dates if (d >= start) & (d < end)]
+        if data.empty:
+            return
+        dates = trading_dates(data.index)
+        if self.method == 'Pattern':
+            hits = pattern_hit_table(data)  # detect patterns once over the whole historical data
         
-        for last_date in last_dates:
-            i = dates.index(last_date)
+        for i in dates.between(start, end):
+            last_date = dates.date(i)
             section = data.iloc[i - self.period + 1: i + 1, :]  # trading(input) data
             if len(section) == self.period:
                 if self.method == 'MinMax':
@@ -182,7 +205,7 @@ class YoloLabeling(Labeling):
                 
                 elif self.method == 'Pattern':
                     self.labels = list(range(Bullish().num + Bearish().num))
-                    labeling = pattern_labeling(section)
+                    labeling = window_pattern_labeling(hits, i - self.period + 1, i)
                 
                 elif self.method == 'Merge':
                     self.labels = [0, 1]
@@ -1,23 +1,71 @@
 import argparse
 from pathlib import Path
 import multiprocessing as mp
-import parmap
-import numpy as np
+from multiprocessing.util import Finalize
+from tqdm import tqdm
+import time
 import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
-from Data.stock import StockMarket, Stock
-from Data.candlestick import CNNChart, YoloChart, CandlstickChart
+from Data.stock import StockMarket, StockPanel
+from Data.candlestick import CNNChart, YoloChart, CandlstickChart, get_config
 import warnings
 warnings.filterwarnings(action='ignore')
 
-def make_ticker_candlesticks(tickers, chart: CandlstickChart, market, start='2006', end='a'):
-    for ticker in tickers:
-        data = Stock(ticker, market).load_data()
-        dates = data.index.tolist()
-        dates = [d for d in dates if (d >= start) & (d < end)]
-        for last_date in dates:
-            chart.make_chart(ticker, last_date)
+worker_chart = None  # chart of this worker process
+def init_worker(chart: CandlstickChart):
+    global worker_chart
+    worker_chart = chart
+    Finalize(chart, chart.close, exitpriority=10)  # close shards and chart arrays when the worker exits
+
+
+def make_chunk(chunk):
+    '''
+    chunk: (ticker, start, end, count) (see CandlstickChart.chunks)
+    return: (chunk, seconds)
+    '''
+    ticker, start, end, _ = chunk
+    t = time.perf_counter()
+    worker_chart.make_charts(ticker, start, end)
+    return chunk, time.perf_counter() - t
+
+
+def make_candlesticks(chart: CandlstickChart, tickers, start='2006', end='a', workers=None, chunk_size=500, resume=False):
+    '''
+    Make charts of tickers with a process pool.
+    Charts are split into (ticker, date range) chunks, and each chunk is given to the next free worker
+    workers: int
+        the number of processes. If None, the number of cores
+    chunk_size: int
+        the number of charts in a chunk
+    resume: bool
+        skip charts recorded in manifest as done with the same chart setting
+    '''
+    done = chart.done_charts() if resume else None
+    chunks = chart.chunks(tickers, start, end, chunk_size, done)
+    if resume:
+        print(f'resume: {len(done)} charts are done, {sum(chunk[3] for chunk in chunks)} charts left')
+    if not chunks:
+        return
+    workers = min(workers or mp.cpu_count(), len(chunks))
+    
+    t = time.perf_counter()
+    timing = list()
+    pool = mp.Pool(workers, initializer=init_worker, initargs=(chart,))
+    with tqdm(total=sum(chunk[3] for chunk in chunks), unit='chart') as pbar:
+        for chunk, seconds in pool.imap_unordered(make_chunk, chunks):
+            timing.append(seconds)
+            pbar.update(chunk[3])
+            pbar.set_postfix_str(f'{chunk[0]} {chunk[1]}~{chunk[2]} {seconds:.1f}s')
+    pool.close()
+    pool.join()
+    
+    wall = time.perf_counter() - t
+    print(
+        f'{len(chunks)} chunks with {workers} workers: {wall:.1f}s '
+        f'(chunk mean {sum(timing) / len(timing):.1f}s, max {max(timing):.1f}s, '
+        f'efficiency {sum(timing) / (wall * workers):.0%})'
+    )
 
 
 if __name__ == '__main__':
@@ -46,6 +94,22 @@ if __name__ == '__main__':
     parser.add_argument(
         '--end', '-e', type=str, default='a', help='Make chart that trade date < end'
     )
+    parser.add_argument(
+        '--panel', action='store_true',
+        help='build the memory-mapped market panel and share it with every process'
+    )
+    
+    parser.add_argument(
+        '--resume', action='store_true',
+        help='make only charts which are not in the manifest of the chart folder (with its chart setting)'
+    )
+    parser.add_argument(
+        '--workers', '-w', type=int, default=None, help='the number of processes (default: the number of cores)'
+    )
+    parser.add_argument(
+        '--chunk-size', type=int, dest='chunk_size', default=500,
+        help='the number of charts given to a process at once'
+    )
     
     base = parser.add_mutually_exclusive_group(required=True)
     base.add_argument(
@@ -75,6 +139,26 @@ if __name__ == '__main__':
         '--style', type=str, default=argparse.SUPPRESS,
         help='plot style of matplotlib (ex. default: white background, dark_style: dark background)'
     )
+    config.add_argument(
+        '--engine', type=str, default='matplotlib', choices=['matplotlib', 'pool', 'numpy'],
+        help='matplotlib: draw chart with new matplotlib figure\n' + \
+             'pool: reuse matplotlib figure and candle collections in each process (a few edge pixels differ)\n' + \
+             'numpy: draw chart straight into numpy buffer (much faster)'
+    )
+    config.add_argument(
+        '--format', '-f', type=str, dest='image_format', default='png', choices=['png', 'webp', 'npy'],
+        help='png / webp (lossless) / npy (raw RGB array)'
+    )
+    config.add_argument(
+        '--output', type=str, default='files', choices=['files', 'shards', 'memmap'],
+        help='files: an image and a pixel csv file per chart\n' + \
+             'shards: tar shards of image, pixel coordinates and metadata with index\n' + \
+             'memmap: raw images in one preallocated uint8 [N, H, W, 3] array with metadata array (for CNN)'
+    )
+    config.add_argument(
+        '--compress-level', type=int, dest='compress_level', default=6,
+        help='png compression, 0 (fastest, largest) ~ 9 (slowest, smallest)'
+    )
     
     feature = parser.add_argument_group('Feature')
     feature.add_argument(
@@ -109,24 +193,24 @@ if __name__ == '__main__':
     args = parser.parse_args()
     
     kwargs = args.__dict__
+    if args.resume:
+        if not args.name:
+            parser.error('--resume needs --name of the chart folder')
+        kwargs.update(get_config(args.name))  # the same chart setting (and colors) as the first run
+        kwargs['exist_ok'] = True
     
     for market in args.market:
         tickers = StockMarket(market.upper()).tickers
         num = args.number if args.number else len(tickers)
         kwargs['market'] = market
+        if args.panel:
+            StockPanel(market).build(tickers[:num])
         if args.cnn:
             chart = CNNChart(**kwargs)
         else:
             chart = YoloChart(**kwargs)
+        if chart.output == 'memmap':
+            chart.allocate(tickers[:num], args.start, args.end, exist_ok=args.resume)
         
-        num_cores = min(10, mp.cpu_count(), num)
-        splited_tickers = np.array_split(tickers[:num], num_cores)
-        splited_tickers = [x.tolist() for x in splited_tickers]
-        
-        parmap.map(
-            make_ticker_candlesticks, splited_tickers,
-            chart, market, args.start, args.end,
-            pm_pbar=True,
-            pm_processes=num_cores
-        )
+        make_candlesticks(chart, tickers[:num], args.start, args.end, args.workers, args.chunk_size, args.resume)
         kwargs['exist_ok'] = True
\ No newline at end of file
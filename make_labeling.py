@@ -9,9 +9,12 @@ import warnings
 warnings.filterwarnings("ignore", category=RuntimeWarning) 
 
 
-def make_labeling(market, number, labeling: Labeling, start='2006', end='a'):
+def make_labeling(market, number, labeling: Labeling, start='2006', end='a', methods=None, intervals=None):
     tickers = StockMarket(market.upper()).tickers
     num = number if number else len(tickers)
+    if isinstance(labeling, CNNLabeling):  # every ticker, method and interval in one pass
+        labeling.process_labelings(tickers[:num], start, end, methods, intervals)
+        return
     for ticker in tickers[:num]:
         labeling.process_labeling(ticker, start, end)
 
@@ -45,14 +48,20 @@ if __name__ == '__main__':
     )
     
     parser.add_argument(
-        '--method', type=str, required=True, help='the method of labeling'
+        '--method', nargs='+', type=str, required=True,
+        help='the method of labeling. CNN can label several n%%_01_2 methods at once\n' + \
+             'Yolo labels each method in the given order (ex. MinMax Pattern Merge)'
     )
     parser.add_argument(
         '--period', type=int, default=argparse.SUPPRESS, help='the trading period of a chart'
     )
     parser.add_argument(
-        '--forecast-interval', '-interval', dest='interval', type=int, default=argparse.SUPPRESS,
-        help='predict n interval after the last input period'
+        '--forecast-interval', '-interval', nargs='+', dest='interval', type=int, default=argparse.SUPPRESS,
+        help='predict n interval after the last input period. CNN can label several intervals at once'
+    )
+    parser.add_argument(
+        '--format', '-f', dest='fmt', type=str, default=None, choices=['npz', 'parquet', 'csv'],
+        help='the format of CNN labeling partitions (default: npz, or the format of saved partitions)'
     )
     parser.add_argument(
         '--name', '-n', type=str, dest='name', default=None, help='the name of chart folder'
@@ -60,11 +69,19 @@ if __name__ == '__main__':
     
     args = parser.parse_args()
     kwargs = args.__dict__
+    methods = kwargs.pop('method')
+    intervals = kwargs.pop('interval', None)
+    kwargs['method'] = methods[0]
+    if intervals:
+        kwargs['interval'] = intervals[0]
 
     for market in args.market:
         kwargs['market'] = market
         if args.cnn:
             labeling = CNNLabeling(**kwargs)
-        else:
+            make_labeling(market, args.number, labeling, args.start, args.end, methods, intervals)
+            continue
+        for method in methods:  # Merge reads MinMax and Pattern labeling, so the order is kept
+            kwargs['method'] = method
             labeling = YoloLabeling(**kwargs)
-        make_labeling(market, args.number, labeling, args.start, args.end)
\ No newline at end of file
+            make_labeling(market, args.number, labeling, args.start, args.end)
\ No newline at end of file
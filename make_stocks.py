@@ -4,6 +4,8 @@ import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
 from Data.stock import StockMarket
+from Data.utils import Downloader
+from Data.source import load_source, set_source
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(formatter_class=argparse.RawTextHelpFormatter)
@@ -17,7 +19,43 @@ if __name__ == '__main__':
     parser.add_argument(
         '--root', '-r', type=str, default=str(Path.cwd()), help='Root Directory of Stock' 
     )
+    parser.add_argument(
+        '--full', action='store_true', help='download full history even if data is saved'
+    )
+    parser.add_argument(
+        '--workers', '-w', type=int, default=8, help='the number of concurrent downloads'
+    )
+    parser.add_argument(
+        '--rate', type=float, default=10.0, help='the number of requests per second'
+    )
+    parser.add_argument(
+        '--retries', type=int, default=5, help='how many times to retry a failed download'
+    )
+    source = parser.add_argument_group('Data Source')
+    source.add_argument(
+        '--source', type=str, default='live', choices=['live', 'replay'],
+        help='live: download from FinanceDataReader and pykrx\n' + \
+             'replay: serve recorded (--replay-root) or synthetic historical data offline'
+    )
+    source.add_argument(
+        '--replay-root', type=str, default=None, help='directory which has recorded Stock folder'
+    )
+    source.add_argument(
+        '--latency', type=float, default=0.0, help='seconds to wait for each replay request'
+    )
+    source.add_argument(
+        '--failure-rate', type=float, default=0.0, help='probability that a replay request fails'
+    )
+    source.add_argument(
+        '--seed', type=int, default=None, help='random seed of replay failure'
+    )
     args = parser.parse_args()
+    if args.source != 'live' and Path(args.root).resolve() == Path.cwd().resolve():
+        # replayed (synthetic tickers collide with real ones) data must not overwrite live data
+        parser.error('--source replay needs --root other than the live data directory')
+
+    set_source(load_source(args.source, args.replay_root, args.latency, args.failure_rate, args.seed))
 
+    downloader = Downloader(workers=args.workers, rate=args.rate, retries=args.retries)
     for market in args.market:
-        StockMarket(market, root=args.root).update_datas()
\ No newline at end of file
+        StockMarket(market, root=Path(args.root), downloader=downloader).update_datas(not args.full)
\ No newline at end of file
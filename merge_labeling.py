@@ -3,6 +3,7 @@ import numpy as np
 import torch
 from Data.candlestick import YoloChart
 from Data.stock import Stock
+from Data.utils import trading_dates
 
 
 def claculate_profit(left_close, right_close):
@@ -52,7 +53,7 @@ def merge_labeling(stock: pd.DataFrame, ticker, last_date, minmax: pd.DataFrame,
     before_drange = {'Label': -1, 'Date': 'empty', 'Range': []}
     chart = YoloChart(market=Stock(ticker).market, exist_ok=True, **config)
     pixel = chart.load_pixel_coordinates(ticker=ticker, last_date=last_date)
-    dates = stock.index.tolist()
+    dates = trading_dates(stock.index)
 
     for row in minmax.to_dict('records'):
         label = int(row.get('Label'))
@@ -63,7 +64,7 @@ def merge_labeling(stock: pd.DataFrame, ticker, last_date, minmax: pd.DataFrame,
         
         drange = minmax_drange(stock, minmax_date, left_thres, right_thres, temp)
         condition1 = drange.index(minmax_date) in [0, len(drange) - 1]
-        condition2 = dates.index(minmax_date) not in [0, len(dates) - 1]
+        condition2 = dates.position(minmax_date) not in [0, len(dates) - 1]
         condition3 = len(drange) < 3
         if condition1 & condition2 | condition3:
             continue
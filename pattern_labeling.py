@@ -1,40 +1,52 @@
 import pandas as pd
+import numpy as np
 from pathlib import Path
 import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
-from Data.utils import Bullish, Bearish
+from Data.utils import Bullish, Bearish, pattern_hits, compile_spec
+
+def pattern_hit_table(data: pd.DataFrame, specs: dict=None) -> dict:
+    '''
+    every pattern hit of historical data, detected once
+    specs: dict
+        {name: pattern spec} of additional patterns (see PatternSpec)
+    return: dict
+        arrays ordered by date, then label
+        Start, End: positions of the first and the last candlestick of the hit
+        Label, Range, Pattern: columns of labeling
+    '''
+    nums = {**Bullish().nums, **Bearish().nums}
+    nums.update({name: compile_spec(name, spec).num for name, spec in (specs or dict()).items()})
+    patterns, hits = pattern_hits(data, specs)  # every pattern of every date at once
 
-def pattern_labeling(data: pd.DataFrame):
-    bullish = Bullish()
-    bearish = Bearish()
-    patterns = list(bullish.nums.keys()) + list(bearish.nums.keys())
-    
     dates = data.index.tolist()
-    labeling_list = []
-    for i, date in enumerate(dates):
-        bullish_pattern = bullish(date, data)
-        bearish_pattern = bearish(date, data)
-        
-        for pattern, check in bullish_pattern.items():
-            label = patterns.index(pattern)
-            if check:
-                bullish_labeling = pd.DataFrame({
-                    'Label': [label],
-                    'Range': '/'.join(dates[i:i+bullish.nums[pattern]]),
-                    'Pattern': pattern
-                })
-                labeling_list.append(bullish_labeling)
-                
-        for pattern, check in bearish_pattern.items():
-            label = patterns.index(pattern)
-            if check:
-                bearish_labeling = pd.DataFrame({
-                    'Label': [label],
-                    'Range': '/'.join(dates[i:i+bearish.nums[pattern]]),
-                    'Pattern': pattern
-                })
-                labeling_list.append(bearish_labeling)
-    
-    labeling = pd.concat(labeling_list)
-    return labeling
\ No newline at end of file
+    index, label = np.nonzero(hits)  # ordered by date, then label
+    num = np.array([nums[pattern] for pattern in patterns], dtype=np.int64)
+    return {
+        'Start': index,
+        'End': index + num[label] - 1,
+        'Label': label,
+        'Range': np.array(['/'.join(dates[i:i+num[l]]) for i, l in zip(index.tolist(), label.tolist())], dtype=object),
+        'Pattern': np.array(patterns, dtype=object)[label],
+    }
+
+
+def window_pattern_labeling(table: dict, start, end) -> pd.DataFrame:
+    '''
+    labeling of the window from start to end position (inclusive): hits whose candlesticks are all in the window
+    It is the same as pattern_labeling(data.iloc[start:end+1])
+    table: dict
+        pattern hits of the whole historical data (see pattern_hit_table)
+    '''
+    lo, hi = np.searchsorted(table['Start'], [start, end + 1])
+    inside = np.flatnonzero(table['End'][lo:hi] <= end) + lo
+    return pd.DataFrame({column: table[column][inside] for column in ['Label', 'Range', 'Pattern']})
+
+
+def pattern_labeling(data: pd.DataFrame, specs: dict=None):
+    '''
+    specs: dict
+        {name: pattern spec} of additional patterns (see PatternSpec)
+    '''
+    return window_pattern_labeling(pattern_hit_table(data, specs), 0, len(data) - 1)
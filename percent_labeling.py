@@ -0,0 +1,63 @@
+import numpy as np
+import pandas as pd
+import re
+
+
+def percent_threshold(method: str) -> float:
+    '''
+    threshold percent of n%_01_2 method (ex. 4%_01_2 -> 4)
+    '''
+    matched = re.fullmatch(r'(\d+(?:\.\d+)?)%_01_2', method)
+    if matched is None:
+        raise ValueError(f'unknown CNN labeling method: {method}')
+    return float(matched.group(1))
+
+
+def percent_labels(close: np.ndarray, positions: np.ndarray, period, interval, threshold) -> np.ndarray:
+    '''
+    n%_01_2 labels of charts whose last candle is at positions
+    close: np.ndarray
+        close prices of every trade date
+    return: np.ndarray
+        int8 label of each position
+        1: close price after interval rises more than threshold percent
+        0: close price after interval declines
+        -1: no label (neither, the chart is shorter than period, or there is no forecast date)
+    '''
+    positions = np.asarray(positions, dtype=np.int64)
+    labels = np.full(len(positions), -1, dtype=np.int8)
+    valid = (positions >= period - 1) & (positions + interval < len(close))
+    starting = close[positions[valid]]
+    endvalue = close[positions[valid] + interval]
+    labels[valid] = np.where(
+        endvalue >= (1 + (threshold / 100)) * starting, 1, np.where(endvalue < starting, 0, -1)
+    )
+    return labels
+
+
+def percent_labeling(data: pd.DataFrame, ticker, positions, period, params) -> dict:
+    '''
+    n%_01_2 labeling of a ticker for every (interval, threshold) at once
+    data: pd.DataFrame
+        historical data of the ticker
+    positions: range
+        positions of last dates to label
+    params: list
+        [(interval, threshold)]
+    return: dict
+        {(interval, threshold): pd.DataFrame of Date, Ticker, Label}
+    '''
+    close = data['Close'].to_numpy()
+    positions = np.arange(positions.start, positions.stop)
+    dates = data.index.to_numpy()[positions]
+
+    labelings = dict()
+    for interval, threshold in params:
+        labels = percent_labels(close, positions, period, interval, threshold)
+        labeled = labels >= 0
+        labelings[(interval, threshold)] = pd.DataFrame({
+            'Date': dates[labeled],
+            'Ticker': ticker,
+            'Label': labels[labeled],
+        })
+    return labelings
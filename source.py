@@ -0,0 +1,320 @@
+'''
+Data sources of stock historical data and ticker list
+
+1. LiveSource
+    download from FinanceDataReader and pykrx
+
+2. ReplaySource
+    serve recorded (saved Stock folder) or synthetic historical data offline
+    with configurable latency and failure injection.
+    It is used to benchmark and load-test downloading.
+'''
+import FinanceDataReader as fdr
+from pykrx.website import krx
+from pykrx import stock
+from pathlib import Path
+from datetime import datetime
+from abc import ABC, abstractmethod
+import threading
+import random
+import time
+import zlib
+import os
+import numpy as np
+import pandas as pd
+import requests
+import sys
+p = Path.absolute(Path.cwd().parent)
+sys.path.append(str(p))
+from Data.utils import load_stock, stock_formats, Downloader
+
+
+krx_market = {'STK': 'KOSPI', 'KSQ': 'KOSDAQ', 'KNX': 'KONEX'}
+
+
+class DataSource(ABC):
+    '''
+    host: str
+        key of the rate limit (see Downloader)
+    '''
+    host = 'default'
+
+    @abstractmethod
+    def ohlcv(self, ticker, start=None, end=None) -> pd.DataFrame:
+        '''
+        historical data with Date column (datetime) and Open, High, Low, Close, Volume columns
+        start: start date of historical data
+        end: end date of historical data
+        '''
+
+    @abstractmethod
+    def tickers(self, market) -> list:
+        '''
+        sorted tickers of the market (KOSPI / KOSDAQ / KONEX / ALL)
+        '''
+
+    @abstractmethod
+    def ticker_market(self, ticker) -> str:
+        '''
+        market of the ticker (KOSPI / KOSDAQ / KONEX)
+        '''
+
+    def listing_dates(self) -> dict:
+        '''
+        {ticker: listing date (%Y-%m-%d)}. Empty if unknown
+        '''
+        return dict()
+
+
+class LiveSource(DataSource):
+    host = 'FinanceDataReader'
+
+    def ohlcv(self, ticker, start=None, end=None) -> pd.DataFrame:
+        return fdr.DataReader(ticker, start=start, end=end).reset_index(level=0)
+
+    def tickers(self, market) -> list:
+        return sorted(stock.get_market_ticker_list(market=market.upper()))
+
+    def ticker_market(self, ticker) -> str:
+        return krx_market.get(krx.get_stock_ticekr_market(ticker))
+
+    def listing_dates(self) -> dict:
+        try:
+            listing = fdr.StockListing('KRX-DESC')
+            dates = pd.to_datetime(listing['ListingDate']).dt.strftime('%Y-%m-%d')
+            return dict(zip(listing['Code'], dates))
+        except (KeyError, ValueError, requests.exceptions.RequestException):
+            return dict()
+
+
+class ReplaySource(DataSource):
+    host = 'replay'
+
+    def __init__(
+        self,
+        root: Path=None,
+        latency=0.0,
+        jitter=0.0,
+        failure_rate=0.0,
+        seed=None,
+        number=100,
+        length=6000,
+        end='2022-12-28',
+    ) -> None:
+        '''
+        root: pathlib.Path
+            directory which has recorded Stock folder. If None, serve synthetic historical data
+        latency: float
+            seconds to wait for each request
+        jitter: float
+            random extra seconds (0 ~ jitter) for each request
+        failure_rate: float
+            probability that a request raises ChunkedEncodingError or ConnectionError
+        seed: int
+            random seed of latency and failure injection.
+            Each request is drawn from (seed, ticker or market, attempt), so runs are reproducible
+            regardless of thread order
+        number: int
+            the number of synthetic tickers in each market
+        length: int
+            the number of synthetic trade dates (business days until end)
+        '''
+        self.root = root
+        self.latency = latency
+        self.jitter = jitter
+        self.failure_rate = failure_rate
+        self.number = number
+        self.length = length
+        self.end = end
+        self.seed = seed
+        self.lock = threading.Lock()
+        self.attempts = dict()  # {ticker or market: the number of requests}
+        self.requests = 0
+        self.failures = 0
+
+    def request(self, key):
+        '''
+        simulate network latency and failure
+        key: str
+            requested ticker or market
+        '''
+        with self.lock:
+            attempt = self.attempts.get(key, 0)
+            self.attempts[key] = attempt + 1
+            self.requests += 1
+        # str seed is hashed with sha512, so draws do not depend on the process (unlike hash())
+        draw = random.Random(f'{self.seed}-{key}-{attempt}') if self.seed is not None else random.Random()
+        delay = self.latency + draw.uniform(0, self.jitter)
+        fail = draw.random() < self.failure_rate
+        error = draw.choice([requests.exceptions.ChunkedEncodingError, requests.exceptions.ConnectionError])
+        if fail:
+            with self.lock:
+                self.failures += 1
+        time.sleep(delay)
+        if fail:
+            raise error('injected failure')
+
+    def ohlcv(self, ticker, start=None, end=None) -> pd.DataFrame:
+        self.request(ticker)
+        data = self.recorded(ticker) if self.root else self.synthetic(ticker)
+        data.index = pd.to_datetime(data.index)
+        data.index.name = 'Date'
+        if start:
+            data = data[data.index >= pd.Timestamp(start)]
+        if end:
+            data = data[data.index <= pd.Timestamp(end)]
+        return data.reset_index(level=0)
+
+    def tickers(self, market) -> list:
+        self.request(market.upper())
+        markets = ['KOSPI', 'KOSDAQ'] if market.upper() == 'ALL' else [market.upper()]
+        tickers = []
+        for market in markets:
+            if self.root:
+                path = self.root / 'Stock' / market.capitalize()
+                tickers += [f.stem for f in path.glob('*.*') if f.suffix[1:] in stock_formats]
+            elif market in ['KOSPI', 'KOSDAQ']:
+                offset = 0 if market == 'KOSPI' else self.number
+                tickers += [f'{i:06d}' for i in range(offset, offset + self.number)]
+        return sorted(set(tickers))
+
+    def ticker_market(self, ticker) -> str:
+        self.request(ticker)
+        return self.find_market(ticker)
+
+    def find_market(self, ticker) -> str:
+        if self.root:
+            for market in krx_market.values():
+                path = self.root / 'Stock' / market.capitalize()
+                if any((path / f'{ticker}.{fmt}').exists() for fmt in stock_formats):
+                    return market
+            return None
+        return 'KOSPI' if int(ticker) < self.number else 'KOSDAQ'
+
+    def recorded(self, ticker) -> pd.DataFrame:
+        market = self.find_market(ticker)
+        if market is None:
+            return pd.DataFrame(columns=['Open', 'High', 'Low', 'Close', 'Volume'])
+        path = self.root / 'Stock' / market.capitalize()
+        fmt = [fmt for fmt in stock_formats if (path / f'{ticker}.{fmt}').exists()][0]
+        return load_stock(path / f'{ticker}.{fmt}')
+
+    def synthetic(self, ticker) -> pd.DataFrame:
+        '''
+        random walk historical data. The same ticker always has the same data
+        '''
+        rng = np.random.default_rng(zlib.crc32(ticker.encode()))
+        dates = pd.bdate_range(end=self.end, periods=self.length)
+        close = np.round(10000 * np.exp(np.cumsum(rng.normal(0, 0.02, self.length))))
+        open = np.round(close * (1 + rng.normal(0, 0.01, self.length)))
+        high = np.maximum(open, close) * (1 + rng.uniform(0, 0.02, self.length))
+        low = np.minimum(open, close) * (1 - rng.uniform(0, 0.02, self.length))
+        volume = rng.integers(1000, 1000000, self.length)
+        return pd.DataFrame({
+            'Open': open, 'High': np.round(high), 'Low': np.round(low), 'Close': close, 'Volume': volume
+        }, index=dates)
+
+
+class TickerUniverse:
+    def __init__(self, root=Path.cwd(), source: DataSource=None, date=None, downloader: Downloader=None) -> None:
+        '''
+        Dated snapshot of every ticker, its market and listing date (Stock/universe/{date}.{host}.csv)
+        It is made once a day for each data source and used to resolve ticker's market and market's tickers without network
+        
+        date: str
+            date of snapshot (%Y-%m-%d). If None, today
+        downloader: Downloader
+            rate limit and retry of listing requests (the same as downloads). If None, default setting
+        '''
+        self.path = root / 'Stock' / 'universe'
+        self.source = source if source else get_source()
+        self.downloader = downloader if downloader else Downloader()
+        self.date = date if date else datetime.now().strftime('%Y-%m-%d')
+        self.file = self.path / f'{self.date}.{self.source.host}.csv'  # replayed tickers never leak into live ones
+
+    def load(self):
+        '''
+        Load snapshot of the date. Make it if it does not exist
+        '''
+        try:
+            universe = pd.read_csv(self.file, dtype=str, keep_default_na=False)
+        except FileNotFoundError:
+            universe = self.make()
+        self.universe = universe
+        self.markets = dict(zip(universe['Ticker'], universe['Market']))
+        return self
+
+    def make(self) -> pd.DataFrame:
+        '''
+        Request every market listing with retry. The snapshot is written only when every listing succeeded
+        '''
+        host = self.source.host
+        rows = []
+        for market in ['KOSPI', 'KOSDAQ', 'KONEX']:
+            tickers = self.downloader.fetch(self.source.tickers, market, host)
+            rows.append(pd.DataFrame({'Ticker': tickers, 'Market': market}))
+        listing_dates = self.downloader.fetch(lambda _: self.source.listing_dates(), None, host)
+        universe = pd.concat(rows).drop_duplicates(subset=['Ticker']).sort_values('Ticker')
+        universe['ListingDate'] = universe['Ticker'].map(listing_dates).fillna('')
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.path / f'{self.file.name}.{os.getpid()}.tmp'
+        universe.to_csv(tmp, index=False)
+        os.replace(tmp, self.file)  # other processes never read a partial snapshot
+        return universe.reset_index(drop=True)
+
+    def market(self, ticker) -> str:
+        '''
+        market of the ticker. Ask data source if the ticker is not in snapshot
+        '''
+        if ticker not in self.markets:
+            self.markets[ticker] = self.downloader.fetch(self.source.ticker_market, ticker, self.source.host)
+        return self.markets[ticker]
+
+    def tickers(self, market='ALL') -> list:
+        '''
+        sorted tickers of the market (KOSPI / KOSDAQ / KONEX / ALL)
+        '''
+        market = market.upper()
+        universe = self.universe if market == 'ALL' else self.universe[self.universe['Market'] == market]
+        return sorted(universe['Ticker'].tolist())
+
+
+default_source = LiveSource()  # data source of this process
+def get_source() -> DataSource:
+    return default_source
+
+
+def set_source(source: DataSource):
+    '''
+    change default data source of this process
+    '''
+    global default_source
+    default_source = source
+
+
+def load_source(name='live', root=None, latency=0.0, failure_rate=0.0, seed=None) -> DataSource:
+    '''
+    name: str
+        live: FinanceDataReader and pykrx
+        replay: recorded historical data in root (synthetic if root is None)
+    '''
+    if name == 'live':
+        return LiveSource()
+    elif name == 'replay':
+        return ReplaySource(Path(root) if root else None, latency=latency, failure_rate=failure_rate, seed=seed)
+    raise ValueError(f'unknown data source: {name}')
+
+
+universes = dict()  # opened ticker universes of this process
+def open_universe(root=Path.cwd(), source: DataSource=None, downloader: Downloader=None) -> TickerUniverse:
+    '''
+    Open today's ticker universe once per process
+    downloader: Downloader
+        rate limit and retry of listing requests when the snapshot is made
+    '''
+    source = source if source else get_source()
+    universe = TickerUniverse(root, source, downloader=downloader)
+    key = (str(root), universe.date, source.host)
+    if key not in universes:
+        universes[key] = universe.load()
+    return universes[key]
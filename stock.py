@@ -1,22 +1,20 @@
 from tqdm import tqdm
-import requests
-import time
 import pandas as pd
+import numpy as np
+from numpy.lib.format import open_memmap
 from pathlib import Path
-import FinanceDataReader as fdr
-from pykrx.website import krx
-from pykrx import stock
 import sys
 p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
-from Data.utils import convert_format, convert_feature_format, dataframe_empty_handler
+from Data.utils import convert_format, convert_feature_format, dataframe_empty_handler, \
+    save_stock, load_stock, stock_formats, PRICE_COLUMNS, Downloader, frame_cache, FeatureStore
+from Data.source import DataSource, get_source, open_universe
 import warnings
 warnings.filterwarnings('ignore', category=FutureWarning)
 
 
-krx_market = {'STK': 'KOSPI', 'KSQ': 'KOSDAQ', 'KNX': 'KONEX'}
 class Stock:
-    def __init__(self, ticker, market='ALL', root=Path.cwd()) -> None:
+    def __init__(self, ticker, market='ALL', root=Path.cwd(), fmt=None, panel=False, source: DataSource=None) -> None:
         '''
         ticker: str
             ticker of stock
@@ -24,19 +22,34 @@ class Stock:
             ALL / KOSPI / KOSDAQ
         root: pathlib.Path
             save directory
+        fmt: str
+            csv / npz / parquet
+            If None, use the existing file format (npz > parquet > csv), csv if there is no file
+        panel: bool
+            if True, load historical data from the market panel (see StockPanel)
+        source: DataSource
+            where to download historical data. If None, default data source (see get_source)
         '''
         self.ticker = ticker
-        self.market = krx_market.get(krx.get_stock_ticekr_market(ticker)) if market=='ALL' else market.upper()
+        self.root = root
+        self.panel = panel
+        self.source = source if source else get_source()
+        self.market = open_universe(root, self.source).market(ticker) if market=='ALL' else market.upper()
         self.path = root / 'Stock' / self.market.capitalize()
         self.path.mkdir(parents=True, exist_ok=True)
+        self.fmt = fmt if fmt else detect_format(self.path, ticker)
+    
+    @property
+    def file(self) -> Path:
+        return self.path / f'{self.ticker}.{self.fmt}'
         
     def download_data(self, start=None, end=None) -> pd.DataFrame:
         '''
-        Download historical data from FinanceDatareader
+        Download historical data from the data source
         start: start date of historical data
         end: end date of historical data
         '''
-        data = fdr.DataReader(self.ticker, start=start, end=end).reset_index(level=0)
+        data = self.source.ohlcv(self.ticker, start=start, end=end)
         self.data = convert_format(data, '%Y-%m-%d %H:%M:%S')
         return self.data
     
@@ -46,40 +59,90 @@ class Stock:
         '''
         Save historical data to the path
         '''
-        self.data.to_csv(self.path / f'{self.ticker}.csv')
+        save_stock(self.data, self.file)
         return self.data
     
     @dataframe_empty_handler
     def load_data(self) -> pd.DataFrame:
         '''
         Load historical data from the path
+        Loaded data is cached in this process (see FrameCache). Do not modify it in place
         '''
-        self.data = pd.read_csv(self.path / f'{self.ticker}.csv', index_col='Date', engine='python', error_bad_lines=False)
+        key = self.cache_key()
+        data = frame_cache.get(key)
+        if data is None:
+            data = self.read_data()
+            frame_cache.put(key, data)
+        self.data = data
         return self.data
     
+    def read_data(self) -> pd.DataFrame:
+        if self.panel:
+            try:
+                panel = open_panel(self.market, self.root)
+                if not panel.stale(self.file):  # updated after the panel was built
+                    return panel.get(self.ticker)
+            except KeyError:  # not in panel
+                pass
+        return load_stock(self.file)
+    
+    def cache_key(self, feature=None) -> tuple:
+        '''
+        feature: tuple
+            feature config. None if raw historical data
+        '''
+        try:
+            mtime = self.file.stat().st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if self.panel:
+            mtime = (mtime, StockPanel(self.market, self.root).built())
+        return (self.market, self.ticker, self.panel, feature, mtime)
+    
     @dataframe_empty_handler
-    def update_data(self) -> pd.DataFrame:
+    def update_data(self, incremental=True) -> pd.DataFrame:
         '''
         Update historical data
+        incremental: bool
+            if True, download only from the last saved date and append newer rows.
+            Download full history when there is no saved data or the last saved row changed
+            (ex. adjusted price)
         '''
-        self.download_data()
-        self.save_data()
+        if incremental:
+            saved = Stock.load_data(self)
+            if not saved.empty:
+                last_date = saved.index[-1]
+                new = Stock.download_data(self, start=last_date)
+                if (not new.empty) and (last_date in new.index) and \
+                    np.allclose(saved.iloc[-1].to_numpy(dtype=float), new.loc[last_date, saved.columns].to_numpy(dtype=float)):
+                    appended = new[new.index > last_date]
+                    self.data = pd.concat([saved, appended])
+                    if self.fmt == 'csv':
+                        appended[saved.columns].to_csv(self.file, mode='a', header=False)  # the same column order as the file
+                    else:
+                        self.save_data()
+                    return self.data
+        Stock.download_data(self)
+        Stock.save_data(self)
         return self.data
 
 
 class FeatureStock(Stock):
-    def __init__(self, ticker, market='ALL', volume=False, SMA=[], EMA=[], MACD=[0, 0, 0], root=Path.cwd()) -> None:
+    def __init__(self, ticker, market='ALL', volume=False, SMA=[], EMA=[], MACD=[0, 0, 0], root=Path.cwd(), fmt=None, panel=False, source=None, store=True) -> None:
         '''
         volume: if include volume feature, True. Else, False.
         SMA: simple moving average period list
         EMA: exponential moving average period list
         MACD: [short period, longer period, oscillator period]
+        store: bool
+            if True, save SMA, EMA, MACD to Stock/{Market}/features and extend them when data is appended
         '''
-        super().__init__(ticker, market, root)
+        super().__init__(ticker, market, root, fmt, panel, source)
         self.volume = volume
         self.SMA = SMA
         self.EMA = EMA
         self.MACD = MACD
+        self.store = store and bool(SMA or EMA or 0 not in MACD)
         
     def download_data(self, start=None, end=None) -> pd.DataFrame:
         data = super().download_data(start, end)
@@ -87,40 +150,227 @@ class FeatureStock(Stock):
         return self.data
     
     def load_data(self) -> pd.DataFrame:
-        data = super().load_data()
-        self.data = convert_feature_format(data, self.volume, self.SMA, self.EMA, self.MACD)
+        feature = (self.volume, tuple(self.SMA), tuple(self.EMA), tuple(self.MACD))
+        key = self.cache_key(feature)
+        data = frame_cache.get(key)
+        if data is None:
+            data = super().load_data().copy()  # do not modify cached raw data
+            features = None
+            if self.store and not data.empty:
+                store = FeatureStore(self.path / 'features', self.ticker, self.SMA, self.EMA, self.MACD)
+                features = store.load(data)
+            data = convert_feature_format(data, self.volume, self.SMA, self.EMA, self.MACD, features)
+            frame_cache.put(key, data)
+        self.data = data
         return self.data
     
     def save_data(self) -> pd.DataFrame:
         return super().save_data()
     
-    def update_data(self) -> pd.DataFrame:
-        return super().update_data()
+    def update_data(self, incremental=True) -> pd.DataFrame:
+        return super().update_data(incremental)
 
 
 class StockMarket:
-    def __init__(self, market='ALL', root=Path.cwd()) -> None:
+    def __init__(self, market='ALL', root=Path.cwd(), source: DataSource=None, downloader: Downloader=None) -> None:
+        '''
+        downloader: Downloader
+            concurrency, rate limit and retry setting of listing and download requests. If None, default setting
+        '''
         self.market =  market.upper()
-        self.tickers = sorted(stock.get_market_ticker_list(market=self.market))
+        self.source = source if source else get_source()
+        self.downloader = downloader if downloader else Downloader()
+        self.tickers = open_universe(root, self.source, self.downloader).tickers(self.market)
         self.root = root
         
-    def update_datas(self):
+    def update_datas(self, incremental=True, downloader=None) -> dict:
         '''
-        If you want to see progress bar, modify code to
-            for i, ticker in enumerate(tqdm(self.tickers)):
+        incremental: bool
+            download only new rows of saved tickers (see Stock.update_data)
+        downloader: Downloader
+            concurrency, rate limit and retry setting. If None, the one of this market
+        
+        return: dict
+            failure report {ticker: exception}
         '''
-        update_tickers(self.tickers, self.market, self.root)
+        downloader = downloader if downloader else self.downloader
+        failures = update_tickers(self.tickers, self.market, self.root, incremental, downloader, self.source)
         print(f'Make {self.market} Stocks Complete!')
+        return failures
+
 
+class StockPanel:
+    def __init__(self, market, root=Path.cwd()) -> None:
+        '''
+        Dense historical data of every ticker in the market.
+        Arrays are memory-mapped, so every process shares one page cache copy.
+
+        prices: float32 [tickers, dates, (Open, High, Low, Close)], NaN when not traded
+        volume: int64 [tickers, dates]
+        offsets: {ticker: (index, start, end)}
+            row of the ticker and its first / last + 1 date position
+        '''
+        self.market = market.upper()
+        self.root = root
+        self.path = root / 'Stock' / self.market.capitalize() / 'panel'
+
+    def build(self, tickers=None):
+        '''
+        Make the panel from saved historical data
+        tickers: list
+            tickers in panel. If None, every saved ticker of the market
+        '''
+        self.path.mkdir(parents=True, exist_ok=True)
+        if tickers is None:
+            files = self.path.parent.glob('*.*')
+            tickers = sorted({f.stem for f in files if f.suffix[1:] in stock_formats})
+        
+        # first pass: union of trade dates
+        indexes = dict()
+        for ticker in tqdm(tickers):
+            data = Stock(ticker, self.market, self.root).load_data()
+            if not data.empty:
+                indexes[ticker] = np.array(data.index, dtype='datetime64[D]')
+        tickers = list(indexes.keys())
+        dates = np.unique(np.concatenate(list(indexes.values()))) if tickers else np.array([], dtype='datetime64[D]')
+        
+        # second pass: fill arrays
+        prices = open_memmap(self.path / 'prices.npy', mode='w+', dtype=np.float32, shape=(len(tickers), len(dates), 4))
+        volume = open_memmap(self.path / 'volume.npy', mode='w+', dtype=np.int64, shape=(len(tickers), len(dates)))
+        prices[:] = np.nan
+        starts, ends = [], []
+        for i, ticker in enumerate(tqdm(tickers)):
+            data = Stock(ticker, self.market, self.root).load_data()
+            position = np.searchsorted(dates, indexes[ticker])
+            prices[i, position] = data[PRICE_COLUMNS].to_numpy(dtype=np.float32)
+            volume[i, position] = data['Volume'].to_numpy(dtype=np.int64)
+            starts.append(position[0])
+            ends.append(position[-1] + 1)
+        prices.flush()
+        volume.flush()
+        del prices, volume
+        
+        np.save(self.path / 'dates.npy', dates)
+        offsets = pd.DataFrame({'Ticker': tickers, 'Start': starts, 'End': ends})
+        offsets.to_csv(self.path / 'tickers.csv', index=False)
+        return self.load()
 
-def update_tickers(tickers, market='ALL', root=Path.cwd()):
-    error_tickers = list()
-    for i, ticker in enumerate(tqdm(tickers)):
-        s = Stock(ticker, market=market, root=root)
+    def built(self):
+        '''
+        build time (mtime of tickers.csv in ns). None if the panel is not built
+        '''
+        try:
+            return (self.path / 'tickers.csv').stat().st_mtime_ns
+        except FileNotFoundError:
+            return None
+
+    def stale(self, file: Path) -> bool:
+        '''
+        whether historical data file was saved after the panel was loaded
+        '''
         try:
-            s.update_data()
-        except requests.exceptions.ChunkedEncodingError:
-            time.sleep(1)
-            error_tickers.append(ticker)
-    if error_tickers:
-        update_tickers(error_tickers, market)
\ No newline at end of file
+            return file.stat().st_mtime_ns > self.time
+        except FileNotFoundError:
+            return False
+
+    def load(self):
+        '''
+        Open the panel arrays (copy-on-write memory map)
+        '''
+        self.time = self.built()
+        self.prices = np.load(self.path / 'prices.npy', mmap_mode='c')
+        self.volume = np.load(self.path / 'volume.npy', mmap_mode='c')
+        self.dates = np.datetime_as_string(np.load(self.path / 'dates.npy'), unit='D').astype(object)
+        offsets = pd.read_csv(self.path / 'tickers.csv', dtype={'Ticker': str})
+        self.offsets = {
+            ticker: (i, start, end)
+            for i, (ticker, start, end) in enumerate(offsets[['Ticker', 'Start', 'End']].itertuples(index=False))
+        }
+        return self
+
+    def get(self, ticker) -> pd.DataFrame:
+        '''
+        Historical data of the ticker. Prices are a view of the panel when there is no missing date
+        '''
+        i, start, end = self.offsets[ticker]
+        prices = self.prices[i, start:end]
+        volume = self.volume[i, start:end]
+        dates = self.dates[start:end]
+        traded = ~np.isnan(prices[:, 0])
+        if not traded.all():
+            prices, volume, dates = prices[traded], volume[traded], dates[traded]
+        
+        data = pd.DataFrame(prices, index=pd.Index(dates, name='Date'), columns=PRICE_COLUMNS, copy=False)
+        data['Volume'] = volume
+        return data
+
+
+def update_tickers(tickers, market='ALL', root=Path.cwd(), incremental=True, downloader: Downloader=None, source: DataSource=None) -> dict:
+    '''
+    Update tickers concurrently
+    downloader: Downloader
+        concurrency, rate limit and retry setting. If None, use default setting
+    source: DataSource
+        where to download historical data. If None, default data source
+    
+    return: dict
+        failure report {ticker: exception}
+    '''
+    downloader = downloader if downloader else Downloader()
+    source = source if source else get_source()
+    
+    def update(ticker):
+        return Stock(ticker, market=market, root=root, source=source).update_data(incremental)
+    
+    failures = downloader.run(update, tickers, host=source.host)
+    if failures:
+        print(f'{len(failures)} tickers failed')
+        for ticker, e in failures.items():
+            print(f'{ticker}: {e.__class__.__name__} {e}')
+    return failures
+
+
+def detect_format(path: Path, ticker):
+    '''
+    return the format of saved historical data
+    '''
+    for fmt in stock_formats:
+        if (path / f'{ticker}.{fmt}').exists():
+            return fmt
+    return 'csv'
+
+
+def convert_stocks(market, fmt='npz', root=Path.cwd(), remove=False):
+    '''
+    Convert every csv historical data of the market to another format
+    fmt: str
+        npz / parquet
+    remove: bool
+        if True, remove csv file after converting
+    '''
+    path = root / 'Stock' / market.capitalize()
+    for file in tqdm(sorted(path.glob('*.csv'))):
+        s = Stock(file.stem, market, root, fmt='csv')
+        data = s.load_data()
+        if data.empty:
+            continue
+        s.fmt = fmt
+        s.save_data()
+        if remove:
+            file.unlink()
+    print(f'Convert {market.upper()} Stocks to {fmt} Complete!')
+
+
+panels = dict()  # opened panels of this process
+def open_panel(market, root=Path.cwd()) -> StockPanel:
+    '''
+    Open the market panel once per process. It is reopened when the panel is built again
+    '''
+    key = (market.upper(), str(root))
+    panel = StockPanel(market, root)
+    built = panel.built()
+    if built is None:
+        raise KeyError(market)
+    if key not in panels or panels[key].time != built:
+        panels[key] = panel.load()
+    return panels[key]
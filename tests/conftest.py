@@ -0,0 +1,53 @@
+'''
+The repository is imported as the Data package, the same as scripts which are run in its parent folder.
+Stock, Image and Labeling folders are made under the working directory, so tests run in a temporary one
+with synthetic historical data of ReplaySource (no network).
+'''
+import importlib.util
+import atexit
+import shutil
+import tempfile
+import os
+import sys
+from pathlib import Path
+import matplotlib
+matplotlib.use('Agg')
+import pytest
+
+root = Path(__file__).resolve().parents[1]
+workdir = Path(tempfile.mkdtemp(prefix='vaiv-data-'))
+atexit.register(shutil.rmtree, workdir, True)
+os.chdir(workdir)  # default roots (Path.cwd()) are bound when Data modules are imported
+
+if 'Data' not in sys.modules:
+    spec = importlib.util.spec_from_file_location('Data', root / '__init__.py', submodule_search_locations=[str(root)])
+    sys.modules['Data'] = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(sys.modules['Data'])
+
+from Data.source import ReplaySource, set_source
+from Data.stock import update_tickers
+
+tickers = ['000000', '000001', '000002']
+set_source(ReplaySource(number=len(tickers), length=400))
+
+
+def download(root: Path, market='KOSPI'):
+    update_tickers(tickers, market, root, incremental=False)
+
+
+@pytest.fixture(scope='session')
+def market():
+    '''
+    market of synthetic historical data saved in the working directory. Do not modify it
+    '''
+    download(workdir)
+    return 'KOSPI'
+
+
+@pytest.fixture
+def stock_root(tmp_path):
+    '''
+    root of synthetic historical data which a test can modify
+    '''
+    download(tmp_path)
+    return tmp_path
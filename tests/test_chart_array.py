@@ -0,0 +1,126 @@
+import numpy as np
+import pytest
+from Data.candlestick import CNNChart, get_config
+from Data.stock import FeatureStock
+from Data.utils import load_manifest
+from conftest import tickers
+
+feature = dict(volume=True, SMA=[5, 20], MACD=[12, 26, 9])
+
+
+def make(chart: CNNChart, tickers, start, end, done=None):
+    '''
+    make charts of chunks in this process (see make_candlesticks)
+    '''
+    for ticker, first, last, _ in chart.chunks(tickers, start, end, 20, done):
+        chart.make_charts(ticker, first, last)
+    chart.close()
+
+
+def test_memmap_output_equals_files_output(market):
+    files = CNNChart(market, name='npy', exist_ok=True, engine='numpy', image_format='npy', **feature)
+    memmap = CNNChart(market, name='memmap', exist_ok=True, engine='numpy', output='memmap', **feature)
+    count = memmap.allocate(tickers, '2022-06', '2022-08')
+    make(files, tickers, '2022-06', '2022-08')
+    make(memmap, tickers, '2022-06', '2022-08')
+
+    array = memmap.chart_array()
+    assert len(array) == count == len(list((files.path / 'images').glob('*.npy')))
+    assert (array.meta['Ticker'] != '').all() and (array.meta['Label'] == -1).all()
+    for ticker, date, image in zip(array.meta['Ticker'], array.meta['Date'], array.images):
+        assert (np.load(files.path / 'images' / f'{ticker}_{date}.npy') == image).all()
+
+
+def test_memmap_resume(market):
+    chart = CNNChart(market, name='resume', exist_ok=True, engine='numpy', output='memmap', **feature)
+    count = chart.allocate(tickers, '2022-06', '2022-08')
+    make(chart, tickers[:1], '2022-06', '2022-08')  # killed after the first ticker
+    done = chart.done_charts()
+    assert len(done) == len(chart.rows[tickers[0]][1])
+
+    resumed = CNNChart(market, name='resume', exist_ok=True, engine='numpy', output='memmap', **feature)
+    assert resumed.allocate(tickers, '2022-06', '2022-08', exist_ok=True) == count
+    assert resumed.done_charts() == done
+    assert sum(chunk[3] for chunk in resumed.chunks(tickers, '2022-06', '2022-08', 20, done)) == count - len(done)
+    make(resumed, tickers, '2022-06', '2022-08', done)
+    assert (resumed.chart_array().meta['Ticker'] != '').all()
+    assert len(resumed.done_charts()) == count
+
+
+@pytest.mark.parametrize('setting', [dict(), feature, dict(volume=True, EMA=[10], MACD=[5, 10, 3])])
+def test_chart_dates_are_feature_rows(market, setting):
+    chart = CNNChart(market, name='dates', exist_ok=True, engine='numpy', **setting)
+    for ticker in tickers:
+        data = FeatureStock(ticker, market, **chart.feature).load_data()
+        assert np.array_equal(chart.chart_dates(ticker).labels, data.index.to_numpy().astype('U10'))
+
+
+def test_chunks_do_not_compute_features(market, monkeypatch):
+    chart = CNNChart(market, name='lazy', exist_ok=True, engine='numpy', output='memmap', **feature)
+    def load_data(self):
+        raise AssertionError('features are computed in the parent process')
+    monkeypatch.setattr(FeatureStock, 'load_data', load_data)
+    count = chart.allocate(tickers, '2022-06', '2022-08')
+    assert sum(chunk[3] for chunk in chart.chunks(tickers, '2022-06', '2022-08', 20)) == count > 0
+
+
+@pytest.mark.parametrize('order, end', [(slice(None), '2022-09'), (slice(None, None, -1), '2022-08')])
+def test_memmap_reallocation_forgets_done_charts(market, order, end):
+    '''
+    another shape (range), or the same shape with other rows (ticker order), is allocated again
+    '''
+    chart = CNNChart(market, name='reallocate', exist_ok=True, engine='numpy', output='memmap', **feature)
+    chart.allocate(tickers, '2022-06', '2022-08')
+    make(chart, tickers, '2022-06', '2022-08')
+    assert chart.done_charts()
+
+    chart.allocate(tickers[order], '2022-06', end, exist_ok=True)
+    assert chart.done_charts() == set()
+    assert load_manifest(chart.path / 'manifest').empty
+    assert (chart.chart_array().meta['Ticker'] == '').all()
+
+
+def test_resumed_setting_has_the_same_hash(market):
+    chart = CNNChart(market, name='setting', exist_ok=True, engine='numpy', output='memmap', **feature)
+    config = get_config('setting')
+    assert config['engine'] == 'numpy'
+    resumed = CNNChart(market, name='setting', exist_ok=True, **config)
+    assert resumed.config_hash() == chart.config_hash()
+
+
+@pytest.mark.parametrize('output', ['files', 'shards'])
+def test_resume_makes_lost_charts_again(market, output):
+    chart = CNNChart(market, name=f'lost-{output}', exist_ok=True, engine='numpy', output=output, **feature)
+    make(chart, tickers, '2022-06', '2022-07')
+    done = chart.done_charts()
+    ticker, date = sorted(done)[3]
+    if output == 'files':
+        (chart.path / 'images' / f'{ticker}_{date}.png').unlink()
+        lost = {(ticker, date)}
+    else:
+        located = {key: chart.shards().locate(f'{key[0]}_{key[1]}', 'png') for key in done}
+        shard, offset, size = located[(ticker, date)]
+        with open(chart.path / 'shards' / shard, 'r+b') as f:
+            f.truncate(offset + size - 1)  # killed while writing the chart
+        lost = {key for key, (other, start, _) in located.items() if other == shard and start >= offset}
+
+    resumed = CNNChart(market, name=f'lost-{output}', exist_ok=True, engine='numpy', output=output, **feature)
+    assert done - resumed.done_charts() == lost
+    chunks = resumed.chunks(tickers, '2022-06', '2022-07', 20, resumed.done_charts())
+    assert sum(chunk[3] for chunk in chunks) == len(lost)
+    make(resumed, tickers, '2022-06', '2022-07', resumed.done_charts())
+    assert resumed.done_charts() == done
+
+
+def test_failed_chart_is_not_done(market, monkeypatch):
+    chart = CNNChart(market, name='failed', exist_ok=True, engine='numpy')
+
+    def batch_draw(data, ends, limits):
+        raise MemoryError
+    monkeypatch.setattr(chart.raster, 'batch_draw', batch_draw)
+    with pytest.raises(MemoryError):
+        chart.make_charts(tickers[0], '2022-06', '2022-07')
+    chart.close()
+    manifest = load_manifest(chart.path / 'manifest')
+    assert manifest['Status'].tolist() == ['failed']
+    assert chart.done_charts() == set()
@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Data.stock import Stock, FeatureStock
+from Data.utils import FeatureStore, frame_cache
+from Data.utils.feature_store import ewm_state, ewm_extend
+from conftest import tickers
+
+
+@pytest.mark.parametrize('span', [2, 12, 26])
+def test_ewm_extend_equals_full_recompute(span):
+    values = np.random.default_rng(span).normal(100, 5, 300)
+    values[100:120] = 100.  # constant run
+    average, state = ewm_state(values[:200], span)
+    extended, _ = ewm_extend(values[200:], state, span)
+    np.testing.assert_allclose(np.concatenate([average, extended]), pd.Series(values).ewm(span=span).mean(), rtol=1e-12)
+
+
+def test_feature_store_extends_appended_rows(stock_root):
+    feature = dict(SMA=[5, 20], EMA=[10], MACD=[12, 26, 9])
+    stock = Stock(tickers[0], 'KOSPI', stock_root)
+    full = stock.load_data()
+    store = FeatureStore(stock.path / 'features', tickers[0], feature['SMA'], feature['EMA'], feature['MACD'])
+    store.load(full.iloc[:-30])  # saved before 30 rows are appended
+    extended = store.load(full)
+    assert len(store.read()['Date']) == len(full)
+
+    recomputed = FeatureStock(tickers[0], 'KOSPI', **feature, root=stock_root, store=False).load_data()
+    frame_cache.clear()  # the cache key does not tell stored features from computed ones
+    stored = FeatureStock(tickers[0], 'KOSPI', **feature, root=stock_root).load_data()
+    pd.testing.assert_frame_equal(extended.loc[recomputed.index], recomputed[extended.columns], rtol=1e-10)
+    pd.testing.assert_frame_equal(stored, recomputed, rtol=1e-10)
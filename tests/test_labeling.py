@@ -0,0 +1,103 @@
+import shutil
+import multiprocessing as mp
+import numpy as np
+import pandas as pd
+import pytest
+from Data.stock import Stock
+from Data.labeling import CNNLabeling
+from Data.percent_labeling import percent_labeling, percent_threshold
+from Data.utils import trading_dates, LabelStore
+from conftest import tickers
+
+
+def loop_labeling(data: pd.DataFrame, ticker, start, end, period, interval, method) -> pd.DataFrame:
+    '''
+    n%_01_2 labeling of each last date one by one (CNNLabeling.process_labeling of the first version)
+    '''
+    dates = data.index.tolist()
+    rows = []
+    for last_date in [d for d in dates if start <= d < end]:
+        i = dates.index(last_date)
+        section = data.iloc[max(i - period + 1, 0): i + 1]
+        if i + interval >= len(data):
+            break
+        if len(section) != period:
+            continue
+        starting = section.loc[last_date, 'Close']
+        endvalue = data.iloc[i + interval]['Close']
+        if endvalue >= (1 + percent_threshold(method) / 100) * starting:
+            rows.append((last_date, ticker, 1))
+        elif endvalue < starting:
+            rows.append((last_date, ticker, 0))
+    return pd.DataFrame(rows, columns=['Date', 'Ticker', 'Label'])
+
+
+@pytest.mark.parametrize('start, end', [('2006', 'a'), ('2022-03', '2022-06')])
+def test_percent_labeling_equals_loop(market, start, end):
+    params = [(5, 4.0), (10, 2.0), (1, 0.5)]
+    for ticker in tickers:
+        data = Stock(ticker, market).load_data()
+        positions = trading_dates(data.index).between(start, end)
+        labelings = percent_labeling(data, ticker, positions, 20, params)
+        for (interval, threshold), labeling in labelings.items():
+            expected = loop_labeling(data, ticker, start, end, 20, interval, f'{threshold:g}%_01_2')
+            assert len(expected)
+            pd.testing.assert_frame_equal(labeling.astype({'Label': np.int64}), expected)
+
+
+@pytest.mark.parametrize('fmt', ['npz', 'csv'])
+def test_label_store_round_trip(tmp_path, fmt):
+    store = LabelStore(tmp_path / 'labeling_20_5', fmt)
+    labelings = {
+        ticker: pd.DataFrame({'Date': [f'2022-01-{d:02d}' for d in range(1, 29)][::-1], 'Ticker': ticker, 'Label': np.arange(28) % 2})
+        for ticker in tickers
+    }
+    for ticker, labeling in labelings.items():
+        store.write(ticker, labeling)
+
+    assert LabelStore(store.path).fmt == fmt
+    assert store.tickers() == tickers
+    expected = pd.concat([labeling.iloc[::-1] for labeling in labelings.values()], ignore_index=True).astype(str)
+    pd.testing.assert_frame_equal(store.load().astype(str), expected)
+    ranged = expected[(expected['Date'] >= '2022-01-10') & (expected['Date'] < '2022-01-20')].reset_index(drop=True)
+    pd.testing.assert_frame_equal(store.load('2022-01-10', '2022-01-20').astype(str), ranged)
+    pd.testing.assert_frame_equal(store.load(columns=['Date', 'Label']).astype(str), expected[['Date', 'Label']])
+
+
+def test_legacy_labeling_is_migrated(market):
+    labeling = CNNLabeling(market, method='3%_01_2')
+    labeling.process_labelings(tickers)
+    full = labeling.load_labeling()
+    store = labeling.label_store()
+    legacy = store.path.parent / f'{store.path.name}.csv'
+    full.to_csv(legacy, index=False)  # single csv file of old version
+    shutil.rmtree(store.path)
+    pd.testing.assert_frame_equal(labeling.load_labeling(), full)
+
+    labeling.process_labelings(tickers[:1], '2022-06')  # label one more range of one ticker
+    assert not legacy.exists()
+    pd.testing.assert_frame_equal(labeling.load_labeling(), full)
+
+
+def migrate(store: LabelStore, legacy):
+    return store.migrate(legacy)
+
+
+def test_legacy_labeling_is_migrated_once(market):
+    '''
+    processes labeling at the same time race to migrate the legacy file
+    '''
+    labeling = CNNLabeling(market, method='3%_01_2')
+    labeling.process_labelings(tickers)
+    full = labeling.load_labeling()
+    store = labeling.label_store()
+    legacy = store.path.parent / f'{store.path.name}.csv'
+    full.to_csv(legacy, index=False)
+    shutil.rmtree(store.path)
+
+    with mp.get_context('fork').Pool(4) as pool:
+        migrated = pool.starmap(migrate, [(store, legacy)] * 8)
+    assert sum(migrated) == 1
+    assert not legacy.exists() and not list(legacy.parent.glob('*.migrating'))
+    assert store.migrate(legacy) is False  # already migrated
+    pd.testing.assert_frame_equal(labeling.load_labeling(), full)
@@ -0,0 +1,72 @@
+import numpy as np
+import pandas as pd
+import pytest
+from Data.stock import Stock
+from Data.labeling import YoloLabeling
+from Data.pattern_labeling import pattern_hit_table, window_pattern_labeling, pattern_labeling
+from Data.utils import PatternSpec, Candles, pattern_hits
+from conftest import tickers
+
+
+def test_spec_equals_python_condition(market):
+    data = Stock(tickers[0], market).load_data()
+    candles = Candles.from_frame(data)
+    spec = PatternSpec('Test', 'not bearish[0] and (close[1] > open[0] or body[1] < 0.5 * candle[1]) and low[0] < low[1] < low[2]')
+    o, h, l, c = (data[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close'])
+    expected = np.zeros(len(data), dtype=bool)
+    for i in range(len(data) - 2):
+        expected[i] = not (o[i] > c[i]) and (c[i + 1] > o[i] or o[i + 1] - c[i + 1] < 0.5 * (h[i + 1] - l[i + 1])) \
+            and l[i] < l[i + 1] < l[i + 2]
+    assert spec.num == 3
+    assert (spec.hits(candles) == expected).all()
+
+
+def test_body_is_signed(market):
+    data = Stock(tickers[0], market).load_data()
+    candles = Candles.from_frame(data)
+    o, c = data['Open'].to_numpy(), data['Close'].to_numpy()
+    assert (o > c).any() and (o < c).any()  # both bearish and bullish candles
+    hits = PatternSpec('Test', 'body[0] > 0').hits(candles)
+    assert (hits == (o > c)).all()
+
+
+@pytest.mark.parametrize('spec', [
+    'close[0]',  # not a condition
+    'not close[0]',
+    'close[0] and bullish[1]',
+    'bullish[0] - bearish[1] > 0',
+    'bullish[0] < bearish[1]',
+    'close[-1] > 0',
+    'volume[0] > 0',
+    'close[0] > __import__("os")',
+])
+def test_invalid_spec_is_rejected(spec):
+    with pytest.raises(ValueError):
+        PatternSpec('Test', spec)
+
+
+def test_builtin_pattern_name_is_rejected(market):
+    data = Stock(tickers[0], market).load_data()
+    with pytest.raises(ValueError, match='Hammer'):
+        pattern_hits(data, {'Hammer': 'bullish[0]'})
+
+
+def test_window_labeling_equals_section_labeling(market):
+    data = Stock(tickers[1], market).load_data()
+    specs = {'ThreeWhiteSoldiers': 'bullish[0] and bullish[1] and bullish[2] and close[0] < close[1] < close[2]'}
+    table = pattern_hit_table(data, specs)
+    period = 60
+    labeled = 0
+    for i in range(period - 1, len(data), 7):
+        section = data.iloc[i - period + 1:i + 1]
+        expected = pattern_labeling(section, specs)
+        labeling = window_pattern_labeling(table, i - period + 1, i)
+        pd.testing.assert_frame_equal(labeling, expected)
+        labeled += len(expected)
+    assert labeled
+
+
+def test_pattern_labeling_of_missing_ticker(market):
+    labeling = YoloLabeling(market, 'Pattern', period=60)
+    labeling.process_labeling('999999')  # no historical data
+    assert not list(labeling.path.glob('999999_*.csv'))
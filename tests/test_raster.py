@@ -0,0 +1,121 @@
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+from Data.candlestick import CNNChart, subplots, hide_axis
+from Data.stock import FeatureStock
+from Data.utils import candlestick_ochl
+from Data.utils.raster import Canvas
+from conftest import tickers
+
+
+def test_polyline_is_linewidth_thick():
+    canvas = Canvas(np.zeros((20, 40, 3), dtype=np.uint8))
+    canvas.polyline([2, 38], [10, 10], 4, np.array([255, 255, 255], dtype=np.uint8))
+    column = canvas.image[:, 20, 0]
+    assert (column[8:12] == 255).all()  # pixel centers within 2 pixels of the line
+    assert (column[:7] == 0).all() and (column[13:] == 0).all()
+    assert 3.5 <= column.sum() / 255 <= 4.5
+
+
+def test_polyline_is_antialiased():
+    canvas = Canvas(np.zeros((20, 40, 3), dtype=np.uint8))
+    canvas.polyline([2, 38], [10.5, 11.5], 1.39, np.array([255, 0, 0], dtype=np.uint8))
+    column = canvas.image[:, 20, 0].astype(int)
+    assert ((column > 0) & (column < 255)).any()
+    assert abs(column.sum() / 255 - 1.39) < 0.3
+    assert (canvas.image[..., 1:] == 0).all()
+
+
+def test_polyline_joins_do_not_depend_on_point_order():
+    '''
+    points in increasing x are drawn in groups of separated segments, others are deduplicated by sorting
+    '''
+    x, y = np.array([2, 9, 16, 23, 30, 37]), np.array([3, 15, 4, 16, 9, 10.5])
+    color = np.array([255, 255, 255], dtype=np.uint8)
+    forward, backward = Canvas(np.zeros((20, 40, 3), dtype=np.uint8)), Canvas(np.zeros((20, 40, 3), dtype=np.uint8))
+    forward.polyline(x, y, 1.39, color)
+    backward.polyline(x[::-1], y[::-1], 1.39, color)
+    assert (forward.image == backward.image).all()
+
+
+@pytest.mark.parametrize('x0, x1', [([1, 3], [5, 7]), ([1, 2, 3], [5, 6, 7])])
+def test_later_rectangle_is_on_top(x0, x1):
+    colors = np.array([[255, 0, 0], [0, 255, 0], [0, 0, 255]], dtype=np.uint8)[:len(x0)]
+    canvas = Canvas(np.zeros((10, 10, 3), dtype=np.uint8))
+    canvas.rectangles(x0, x1, [1] * len(x0), [5] * len(x0), colors)
+    expected = np.zeros((10, 10, 3), dtype=np.uint8)
+    for a, b, color in zip(x0, x1, colors):
+        expected[1:5, a:b] = color
+    assert (canvas.image == expected).all()
+
+
+def matplotlib_pixels(chart, c) -> np.ndarray:
+    '''
+    pixel coordinates of each candle from the data -> display transform of matplotlib figure (see CandlstickChart.plot)
+    '''
+    plt.style.use(chart.style)
+    num, ax = subplots(chart.feature.get('volume'), chart.feature.get('MACD'))
+    fig = plt.figure(figsize=(chart.size[0]/100, chart.size[1]/100))
+    ax1 = fig.add_subplot(ax[0])
+    hide_axis(ax1)
+    plt.tight_layout(pad=0)
+    quote = c[['Open', 'Close', 'High', 'Low']].reset_index(drop=True)
+    quote.insert(0, 't', np.arange(1, chart.period * chart.linespace + 1, chart.linespace))
+    lines, patches = candlestick_ochl(ax1, quote.values, width=chart.candlewidth, colorup=chart.color.get('up'), colordown=chart.color.get('down'))
+    for i, span in enumerate(chart.feature.get('SMA')):
+        ax1.plot(pd.concat([pd.Series([None]), c[f'{span}SMA']]).reset_index(drop=True), linewidth=chart.linewidth)
+    if chart.feature.get('volume'):
+        fig.add_subplot(ax[1])
+    if not 0 in chart.feature.get('MACD'):
+        fig.add_subplot(ax[num])
+    fig.canvas.draw()
+
+    transform = ax1.transData.transform
+    x = transform(np.array([[p.get_x(), 0] for p in patches] + [[p.get_x() + p.get_width(), 0] for p in patches]))[:, 0]
+    y = transform(np.array([[0, v] for line in lines for v in line.get_ydata()]))[:, 1].reshape(len(lines), -1)
+    plt.close(fig)
+    height = chart.size[1]
+    return np.stack([x[:len(patches)], height - y.max(axis=1), x[len(patches):], height - y.min(axis=1)], axis=1)
+
+
+@pytest.mark.parametrize('feature', [dict(), dict(volume=True, SMA=[5], MACD=[12, 26, 9])])
+def test_pixels_equal_matplotlib_transform(market, feature):
+    chart = CNNChart(market, name='pixels', exist_ok=True, engine='numpy', **feature)
+    data = FeatureStock(tickers[0], market, **chart.feature).load_data()
+    ends = np.arange(100, 110)
+    batch = chart.raster.batch_pixels(data, ends, chart.raster.batch_limits(data, ends))
+    for k, i in enumerate(ends):
+        c = data.iloc[i - chart.period + 1:i + 1]
+        expected = matplotlib_pixels(chart, c)
+        np.testing.assert_allclose(chart.raster.pixels(c), expected, atol=1e-6)
+        np.testing.assert_allclose(batch[k], expected, atol=1e-6)
+
+
+def test_batch_draw_equals_draw(market):
+    chart = CNNChart(market, name='batch', exist_ok=True, engine='numpy', volume=True, SMA=[5, 20], MACD=[12, 26, 9])
+    chart.raster.batch = 7  # the last batch is smaller
+    data = FeatureStock(tickers[0], market, **chart.feature).load_data()
+    ends = np.arange(100, 120)
+    limits = chart.raster.batch_limits(data, ends)
+    images = chart.raster.batch_draw(data, ends, limits)
+    for k, i in enumerate(ends):
+        image, _ = chart.raster.draw(data.iloc[i - chart.period + 1:i + 1], limits[k])
+        assert (images[k] == image).all()
+
+
+@pytest.mark.parametrize('engine, feature, tolerance', [
+    ('numpy', dict(), 0.04),
+    ('numpy', dict(volume=True, SMA=[5, 20], MACD=[12, 26, 9]), 0.075),
+    ('pool', dict(volume=True, SMA=[5, 20], MACD=[12, 26, 9]), 0.01),
+])
+def test_engine_pixels_agree_with_matplotlib(market, engine, feature, tolerance):
+    '''
+    share of pixels which differ from the default (per-candle matplotlib) engine
+    '''
+    chart = CNNChart(market, name='agreement', exist_ok=True, engine=engine, **feature)
+    data = FeatureStock(tickers[0], market, **chart.feature).load_data()
+    ends = np.arange(100, 120)
+    images = chart.draw_charts(data, ends, chart.raster.batch_limits(data, ends))
+    differ = [(chart.plot(data.iloc[i - chart.period + 1:i + 1]) != image).any(axis=2).mean() for i, image in zip(ends, images)]
+    assert np.mean(differ) < tolerance
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from Data.candlestick import CNNChart
+from Data.utils import ShardWriter, ShardReader
+from conftest import tickers
+
+
+def test_shard_round_trip(tmp_path):
+    writer = ShardWriter(tmp_path, prefix='test', max_count=3)
+    samples = {f'{i:06d}': {'png': bytes([i]) * (i * 100 + 1), 'json': b'{}'} for i in range(8)}
+    for key, members in samples.items():
+        writer.write(key, members)
+    writer.close()
+    assert len(list(tmp_path.glob('test-*.tar'))) == 3
+
+    reader = ShardReader(tmp_path)
+    for key, members in samples.items():
+        for member, data in members.items():
+            assert reader.read(key, member) == data
+    with pytest.raises(FileNotFoundError):
+        reader.read('999999', 'png')
+
+
+def test_shard_reader_reloads_only_changed_index(tmp_path, monkeypatch):
+    writer = ShardWriter(tmp_path, prefix='test')
+    writer.write('a', {'png': b'a'})
+    reader = ShardReader(tmp_path)
+    writer.write('b', {'png': b'b'})  # written after loading index
+
+    reads = []
+    read_csv = pd.read_csv
+    monkeypatch.setattr(pd, 'read_csv', lambda *args, **kwargs: reads.append(args[0]) or read_csv(*args, **kwargs))
+    assert reader.read('b', 'png') == b'b'
+    assert len(reads) == 1
+    with pytest.raises(FileNotFoundError):
+        reader.read('c', 'png')
+    assert len(reads) == 1  # index did not change
+    writer.close()
+
+
+def test_shards_output_equals_files_output(market):
+    files = CNNChart(market, name='files', exist_ok=True, engine='numpy')
+    shards = CNNChart(market, name='shards', exist_ok=True, engine='numpy', output='shards')
+    for chart in [files, shards]:
+        chart.make_charts(tickers[0], '2022-01', '2022-02')
+        chart.close()
+    dates = sorted(file.stem.split('_')[1] for file in (files.path / 'images').glob('*.png'))
+    assert dates and not list((shards.path / 'images').iterdir())
+    for date in dates:
+        assert shards.load_chart(tickers[0], date) == files.load_chart(tickers[0], date)
+        assert shards.load_chart_path(tickers[0], date).read_bytes() == files.load_chart(tickers[0], date)
+        pd.testing.assert_frame_equal(shards.load_pixel_coordinates(tickers[0], date), files.load_pixel_coordinates(tickers[0], date))
@@ -0,0 +1,68 @@
+from concurrent.futures import ThreadPoolExecutor
+import pytest
+import requests
+from Data.source import DataSource, ReplaySource, TickerUniverse
+from Data.utils import Downloader
+
+
+def outcomes(source: ReplaySource, tickers, workers):
+    '''
+    {(ticker, attempt): failed} of 3 requests of each ticker
+    '''
+    def request(ticker):
+        failed = []
+        for _ in range(3):
+            try:
+                source.ohlcv(ticker)
+                failed.append(False)
+            except requests.exceptions.RequestException:
+                failed.append(True)
+        return ticker, failed
+
+    with ThreadPoolExecutor(workers) as executor:
+        return dict(executor.map(request, tickers))
+
+
+def test_replay_failures_do_not_depend_on_thread_order():
+    tickers = [f'{i:06d}' for i in range(20)]
+    first = outcomes(ReplaySource(failure_rate=0.5, seed=0, number=20, length=30), tickers, 1)
+    second = outcomes(ReplaySource(failure_rate=0.5, seed=0, number=20, length=30), tickers[::-1], 4)
+    assert first == second
+    assert 0 < sum(sum(failed) for failed in first.values()) < 60
+
+
+def test_data_source_is_abstract():
+    with pytest.raises(TypeError):
+        DataSource()
+
+
+class SmallReplay(ReplaySource):
+    host = 'small-replay'
+
+
+def test_universe_snapshot_is_kept_per_source(tmp_path):
+    replay = TickerUniverse(tmp_path, ReplaySource(number=2), '2022-12-28').load()
+    small = TickerUniverse(tmp_path, SmallReplay(number=1), '2022-12-28').load()
+    assert replay.tickers() == ['000000', '000001', '000002', '000003']
+    assert small.tickers() == ['000000', '000001']
+    assert TickerUniverse(tmp_path, ReplaySource(number=5), '2022-12-28').load().tickers() == replay.tickers()
+
+
+def test_universe_listing_is_retried(tmp_path):
+    source = ReplaySource(number=2, failure_rate=0.5, seed=0)
+    universe = TickerUniverse(tmp_path, source, '2022-12-28', Downloader(retries=20, backoff=0.001)).load()
+    assert source.failures > 0
+    assert universe.tickers() == ['000000', '000001', '000002', '000003']
+
+
+def test_failed_listing_does_not_write_snapshot(tmp_path):
+    class BrokenKonex(ReplaySource):
+        def tickers(self, market):
+            if market == 'KONEX':
+                raise requests.exceptions.ConnectionError('injected failure')
+            return super().tickers(market)
+
+    universe = TickerUniverse(tmp_path, BrokenKonex(number=2), '2022-12-28', Downloader(retries=2, backoff=0.001))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        universe.load()
+    assert not list((tmp_path / 'Stock' / 'universe').glob('*'))
@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+from Data.source import ReplaySource
+from Data.stock import Stock, StockPanel, StockMarket
+from Data.utils import Downloader
+from conftest import tickers
+
+
+def test_panel_equals_saved_data(stock_root):
+    StockPanel('KOSPI', stock_root).build(tickers)
+    for ticker in tickers:
+        panel = Stock(ticker, 'KOSPI', stock_root, panel=True).load_data()
+        saved = Stock(ticker, 'KOSPI', stock_root).load_data()
+        pd.testing.assert_frame_equal(panel, saved, check_dtype=False)
+
+
+def test_panel_is_not_used_after_update(stock_root):
+    StockPanel('KOSPI', stock_root).build(tickers)
+    stock = Stock(tickers[0], 'KOSPI', stock_root, panel=True)
+    assert len(stock.load_data()) == 400
+
+    saved = Stock(tickers[0], 'KOSPI', stock_root)
+    saved.data = saved.load_data().iloc[:-10]
+    saved.save_data()  # saved after the panel was built
+    assert len(Stock(tickers[0], 'KOSPI', stock_root, panel=True).load_data()) == 390
+
+    StockPanel('KOSPI', stock_root).build(tickers)  # rebuilt panel is reopened
+    assert len(Stock(tickers[0], 'KOSPI', stock_root, panel=True).load_data()) == 390
+    assert len(Stock(tickers[1], 'KOSPI', stock_root, panel=True).load_data()) == 400
+
+
+def test_incremental_update_appends_rows(stock_root):
+    stock = Stock(tickers[0], 'KOSPI', stock_root)
+    full = stock.load_data()
+    stock.data = full.iloc[:-5]
+    stock.save_data()
+
+    Stock(tickers[0], 'KOSPI', stock_root).update_data(incremental=True)
+    updated = Stock(tickers[0], 'KOSPI', stock_root).load_data()
+    assert stock.fmt == 'csv'
+    pd.testing.assert_frame_equal(updated, full)
+
+
+def test_market_update_survives_failures(tmp_path):
+    source = ReplaySource(number=10, length=100, failure_rate=0.3, seed=0)
+    market = StockMarket('KOSPI', tmp_path, source, Downloader(retries=20, backoff=0.001))
+    failures = market.update_datas(incremental=False)
+    assert source.failures > 0
+    assert failures == {}
+    assert market.tickers == [f'{i:06d}' for i in range(10)]
+    assert all(len(Stock(ticker, 'KOSPI', tmp_path).load_data()) == 100 for ticker in market.tickers)
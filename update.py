@@ -5,17 +5,23 @@ p = Path.absolute(Path.cwd().parent)
 sys.path.append(str(p))
 from Data.stock import StockMarket
 from Data.candlestick import CandlstickChart, get_config
+from Data.utils import Downloader
+from Data.source import load_source, set_source
 import exchange_calendars as ecals
-from datetime import datetime
+from datetime import datetime, timedelta
 import warnings
 warnings.simplefilter(action='ignore', category=FutureWarning)
 
 
-def update_name_candlesticks(tickers, market, name, today):
-    config = get_config(name)
-    chart = CandlstickChart(**config, market=market, name=name, exist_ok=True)
+def update_name_candlesticks(tickers, market, name, today, root=Path.cwd()):
+    config = get_config(name, root)
+    chart = CandlstickChart(**config, market=market, name=name, exist_ok=True, root=root)
+    if chart.output == 'memmap':  # preallocated chart array cannot grow
+        chart.output = 'files'
+    tomorrow = (datetime.strptime(today, '%Y-%m-%d') + timedelta(days=1)).strftime('%Y-%m-%d')
     for ticker in tickers:
-        chart.make_chart(ticker, today)
+        chart.make_charts(ticker, today, tomorrow)
+    chart.close()
 
 
 def DateCheck(today):
@@ -23,14 +29,18 @@ def DateCheck(today):
     return XKRX.is_session(today)
 
 
-def update(market, name):
+def update(market, name, downloader=None, root=Path.cwd()):
+    '''
+    root: pathlib.Path
+        directory of Stock and Image folders to update
+    '''
     today = datetime.now()
     today = today.strftime('%Y-%m-%d')
     if DateCheck(today):
-        stockmarket = StockMarket(market.upper())
+        stockmarket = StockMarket(market.upper(), root, downloader=downloader)
         stockmarket.update_datas()  # update stock
         tickers = stockmarket.tickers
-        update_name_candlesticks(tickers, market, name, today)
+        update_name_candlesticks(tickers, market, name, today, root)
         
 
 if __name__ == '__main__':
@@ -45,7 +55,41 @@ if __name__ == '__main__':
              'KOSDAQ: Stock market includes KOSDAQ only\n' + \
              'KONEX: Stock market includes KONEX only'
     )
+    parser.add_argument(
+        '--root', '-r', type=str, default=str(Path.cwd()), help='Root Directory of Stock and Image'
+    )
+    parser.add_argument(
+        '--workers', '-w', type=int, default=8, help='the number of concurrent downloads'
+    )
+    parser.add_argument(
+        '--rate', type=float, default=10.0, help='the number of requests per second'
+    )
+    source = parser.add_argument_group('Data Source')
+    source.add_argument(
+        '--source', type=str, default='live', choices=['live', 'replay'],
+        help='live: download from FinanceDataReader and pykrx\n' + \
+             'replay: serve recorded (--replay-root) or synthetic historical data offline'
+    )
+    source.add_argument(
+        '--replay-root', type=str, default=None, help='directory which has recorded Stock folder'
+    )
+    source.add_argument(
+        '--latency', type=float, default=0.0, help='seconds to wait for each replay request'
+    )
+    source.add_argument(
+        '--failure-rate', type=float, default=0.0, help='probability that a replay request fails'
+    )
+    source.add_argument(
+        '--seed', type=int, default=None, help='random seed of replay failure'
+    )
     args = parser.parse_args()
+    root = Path(args.root).resolve()
+    if args.source != 'live' and root == Path.cwd().resolve():
+        # replayed (synthetic tickers collide with real ones) data must not overwrite live data
+        parser.error('--source replay needs --root other than the live data directory')
+
+    set_source(load_source(args.source, args.replay_root, args.latency, args.failure_rate, args.seed))
 
+    downloader = Downloader(workers=args.workers, rate=args.rate)
     for market in args.market:
-        update(market, args.name)
\ No newline at end of file
+        update(market, args.name, downloader, root)
\ No newline at end of file
@@ -1,4 +1,15 @@
 from .util import *
 from .stock_format import *
 from .mpf import *
-from .pattern import *
\ No newline at end of file
+from .pattern import *
+from .downloader import *
+from .cache import *
+from .feature_store import *
+from .trading_dates import *
+from .raster import *
+from .image_format import *
+from .shard import *
+from .chart_array import *
+
+from .manifest import *
+from .label_store import *
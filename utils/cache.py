@@ -0,0 +1,60 @@
+from collections import OrderedDict
+import threading
+import pandas as pd
+
+
+class FrameCache:
+    def __init__(self, budget=256 * 2**20) -> None:
+        '''
+        LRU cache of DataFrames shared in a process
+        budget: int
+            maximum memory (bytes) of cached DataFrames. The least recently used one is evicted first
+        
+        Cached DataFrames are shared. Do not modify them in place.
+        '''
+        self.budget = budget
+        self.frames = OrderedDict()
+        self.sizes = dict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+
+    def get(self, key) -> pd.DataFrame:
+        '''
+        return None if key is not cached
+        '''
+        with self.lock:
+            frame = self.frames.get(key)
+            if frame is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self.frames.move_to_end(key)
+            return frame
+
+    def put(self, key, frame: pd.DataFrame):
+        if frame.empty:
+            return
+        size = int(frame.memory_usage(index=True, deep=True).sum())
+        if size > self.budget:
+            return
+        with self.lock:
+            if key in self.frames:
+                self.size -= self.sizes.pop(key)
+                del self.frames[key]
+            self.frames[key] = frame
+            self.sizes[key] = size
+            self.size += size
+            while self.size > self.budget:
+                old, _ = self.frames.popitem(last=False)
+                self.size -= self.sizes.pop(old)
+
+    def clear(self):
+        with self.lock:
+            self.frames.clear()
+            self.sizes.clear()
+            self.size = 0
+
+
+frame_cache = FrameCache()  # cache of this process
@@ -0,0 +1,104 @@
+'''
+Charts as preallocated arrays on disk
+
+A chart array is a directory of two .npy files which can be opened with np.load(mmap_mode='r')
+    images.npy: uint8 [N, height, width, 3]
+    meta.npy: [N] of (Ticker, Date, Label). Label is -1 until the dataset is labeled
+Rows are allocated before drawing, so every process writes its own rows of the same files.
+'''
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import os
+
+
+meta_dtype = np.dtype([('Ticker', 'U10'), ('Date', 'U10'), ('Label', 'i1')])
+
+
+class ChartArray:
+    def __init__(self, path: Path, mode='r') -> None:
+        '''
+        Open chart array (see create)
+        path: pathlib.Path
+            directory of images.npy and meta.npy
+        mode: str
+            r: read only, r+: write rows
+        '''
+        self.path = path
+        self.images = np.load(path / 'images.npy', mmap_mode=mode)
+        self.meta = np.load(path / 'meta.npy', mmap_mode=mode)
+
+    @classmethod
+    def create(cls, path: Path, count, size):
+        '''
+        Preallocate chart array of count charts (existing one is overwritten)
+        size: list
+            [width, height] of chart image
+        '''
+        path.mkdir(parents=True, exist_ok=True)
+        images = np.lib.format.open_memmap(path / 'images.npy', mode='w+', dtype=np.uint8, shape=(count, size[1], size[0], 3))
+        meta = np.lib.format.open_memmap(path / 'meta.npy', mode='w+', dtype=meta_dtype, shape=(count,))
+        meta['Label'] = -1
+        images.flush()
+        meta.flush()
+        del images, meta
+        return cls(path, 'r+')
+
+    def __len__(self) -> int:
+        return len(self.meta)
+
+    def write(self, row, image: np.ndarray, ticker, date, label=-1):
+        self.images[row] = image
+        self.meta[row] = (ticker, date, label)
+
+    def rows(self, tickers, dates) -> np.ndarray:
+        '''
+        rows of (ticker, date) pairs. -1 if the chart is not in the array
+        '''
+        meta = pd.DataFrame({'Ticker': self.meta['Ticker'], 'Date': self.meta['Date']})
+        index = pd.MultiIndex.from_frame(meta)
+        return index.get_indexer(pd.MultiIndex.from_arrays([np.asarray(tickers, dtype=str), np.asarray(dates, dtype=str)]))
+
+    def flush(self):
+        if isinstance(self.images, np.memmap):
+            self.images.flush()
+            self.meta.flush()
+
+
+def gather_charts(chart_array: ChartArray, rows, path: Path, labels=None) -> ChartArray:
+    '''
+    Copy rows of chart array into a new chart array (ex. train / valid / test of dataset)
+    labels: list
+        label of each row. If None, keep labels of chart array
+    '''
+    rows = np.asarray(rows, dtype=np.int64)
+    _, height, width, _ = chart_array.images.shape
+    gathered = ChartArray.create(path, len(rows), [width, height])
+    step = 1024  # copy in blocks to bound memory
+    for i in range(0, len(rows), step):
+        gathered.images[i:i + step] = chart_array.images[rows[i:i + step]]
+    gathered.meta[:] = chart_array.meta[rows]
+    if labels is not None:
+        gathered.meta['Label'] = np.asarray(labels, dtype=np.int8)
+    gathered.flush()
+    return gathered
+
+
+chart_arrays = dict()  # chart arrays opened for writing in this process
+def chart_array(path: Path) -> ChartArray:
+    '''
+    ChartArray of the directory opened for writing in this process
+    '''
+    key = (str(path), os.getpid())
+    if key not in chart_arrays:
+        chart_arrays[key] = ChartArray(path, 'r+')
+    return chart_arrays[key]
+
+
+def close_chart_arrays():
+    '''
+    Flush and close every chart array of this process
+    '''
+    for array in chart_arrays.values():
+        array.flush()
+    chart_arrays.clear()
@@ -0,0 +1,112 @@
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from tqdm import tqdm
+import threading
+import random
+import time
+import requests
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: int=None) -> None:
+        '''
+        rate: float
+            the number of requests per second
+        capacity: int
+            the number of requests that can be sent at once (burst)
+        '''
+        self.rate = rate
+        self.capacity = capacity if capacity else max(1, int(rate))
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        '''
+        wait until a token is available and take it
+        '''
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class Downloader:
+    def __init__(
+        self,
+        workers=8,
+        rate=10.0,
+        burst=None,
+        retries=5,
+        backoff=1.0,
+        max_backoff=30.0,
+        exceptions=(requests.exceptions.RequestException, ConnectionError, TimeoutError),
+    ) -> None:
+        '''
+        workers: int
+            the number of concurrent downloads
+        rate: float
+            requests per second of each host
+        burst: int
+            token bucket capacity of each host
+        retries: int
+            how many times to retry a failed download
+        backoff: float
+            first retry delay (seconds). It doubles every retry up to max_backoff
+        exceptions: tuple
+            exceptions to retry. Others fail immediately
+        '''
+        self.workers = workers
+        self.rate = rate
+        self.burst = burst
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.exceptions = exceptions
+        self.buckets = dict()
+        self.lock = threading.Lock()
+
+    def bucket(self, host) -> TokenBucket:
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.rate, self.burst)
+            return self.buckets[host]
+
+    def fetch(self, func, item, host):
+        '''
+        call func(item) with rate limit and exponential backoff
+        '''
+        bucket = self.bucket(host)
+        for attempt in range(self.retries + 1):
+            bucket.acquire()
+            try:
+                return func(item)
+            except self.exceptions:
+                if attempt == self.retries:
+                    raise
+                delay = min(self.max_backoff, self.backoff * 2 ** attempt)
+                time.sleep(delay * random.uniform(0.5, 1))  # jitter
+
+    def run(self, func, items, host='default') -> dict:
+        '''
+        call func for every item concurrently
+        host: str
+            key of the rate limit that func requests
+        
+        return: dict
+            failure report {item: exception}
+        '''
+        failures = dict()
+        with ThreadPoolExecutor(max_workers=self.workers) as executor:
+            futures = {executor.submit(self.fetch, func, item, host): item for item in items}
+            for future in tqdm(as_completed(futures), total=len(futures)):
+                try:
+                    future.result()
+                except Exception as e:
+                    failures[futures[future]] = e
+        return failures
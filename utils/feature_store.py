@@ -0,0 +1,138 @@
+from pathlib import Path
+from typing import List
+import numpy as np
+import pandas as pd
+import os
+
+
+def ewm_state(values: np.ndarray, span):
+    '''
+    pandas ewm(span).mean() (adjust=True) and its last state (weighted average, old weight)
+    '''
+    average = pd.Series(values).ewm(span=span).mean().to_numpy()
+    old_wt_factor = 1. - 1. / (1. + (span - 1) / 2.)
+    old_wt = 1.
+    for _ in range(len(values) - 1):
+        old_wt = old_wt * old_wt_factor + 1.
+    return average, np.array([average[-1], old_wt])
+
+
+def ewm_extend(values: np.ndarray, state: np.ndarray, span):
+    '''
+    continue pandas ewm(span).mean() from state with new values
+    It is the same recurrence as pandas, so the result equals recomputing the whole series
+    '''
+    old_wt_factor = 1. - 1. / (1. + (span - 1) / 2.)
+    weighted, old_wt = state
+    average = np.empty(len(values))
+    for i, cur in enumerate(values):
+        old_wt *= old_wt_factor
+        if weighted != cur:  # avoid numerical errors on constant series (same as pandas)
+            weighted = (old_wt * weighted + cur) / (old_wt + 1.)
+        old_wt += 1.
+        average[i] = weighted
+    return average, np.array([weighted, old_wt])
+
+
+def sma_extend(values: np.ndarray, n, span):
+    '''
+    rolling(span).mean() of values from n-th value
+    '''
+    start = max(0, n - span + 1)
+    return pd.Series(values[start:]).rolling(span).mean().to_numpy()[n - start:]
+
+
+class FeatureStore:
+    def __init__(self, path: Path, ticker, SMA: List[int], EMA: List[int], MACD: List[int]) -> None:
+        '''
+        Precomputed SMA, EMA, MACD of a ticker saved next to historical data
+        path: pathlib.Path
+            directory of feature files (Stock/{Market}/features)
+
+        File has Date and Close of the historical data used, each feature column,
+        and EWM states to extend EMA and MACD when new rows are appended
+        '''
+        self.SMA = SMA
+        self.EMA = EMA
+        self.MACD = MACD
+        name = '_'.join([
+            ticker,
+            'SMA' + '-'.join(map(str, SMA)),
+            'EMA' + '-'.join(map(str, EMA)),
+            'MACD' + '-'.join(map(str, MACD)),
+        ])
+        self.path = path
+        self.file = path / f'{name}.npz'
+
+    @property
+    def columns(self) -> list:
+        columns = [f'{span}SMA' for span in self.SMA] + [f'{span}EMA' for span in self.EMA]
+        if not 0 in self.MACD:
+            columns += ['MACD', 'MACD_Signal']
+        return columns
+
+    def load(self, stock: pd.DataFrame) -> pd.DataFrame:
+        '''
+        features of stock historical data
+        Compute only appended rows if saved features are computed from the previous data,
+        else compute every row again
+        '''
+        close = stock['Close'].to_numpy(dtype=np.float64)
+        dates = np.array(stock.index, dtype='datetime64[D]')
+        saved = self.read()
+        n = len(saved['Date']) if saved else 0
+
+        if saved and (0 < n <= len(dates)) and (saved['Date'][-1] == dates[n-1]) and (saved['Close'][-1] == close[n-1]):
+            if n < len(dates):
+                features = self.extend(saved, close, n)
+                self.write(features, dates, close)
+            else:
+                features = saved
+        else:
+            features = self.compute(close)
+            self.write(features, dates, close)
+        return pd.DataFrame({col: features[col] for col in self.columns}, index=stock.index)
+
+    def compute(self, close: np.ndarray) -> dict:
+        features = dict()
+        for span in self.SMA:
+            features[f'{span}SMA'] = pd.Series(close).rolling(span).mean().to_numpy()
+        for span in self.EMA:
+            features[f'{span}EMA'], features[f'{span}EMA_state'] = ewm_state(close, span)
+        if not 0 in self.MACD:
+            ema_short, features['MACD_short_state'] = ewm_state(close, self.MACD[0])
+            ema_long, features['MACD_long_state'] = ewm_state(close, self.MACD[1])
+            features['MACD'] = ema_short - ema_long
+            features['MACD_Signal'], features['MACD_Signal_state'] = ewm_state(features['MACD'], self.MACD[2])
+        return features
+
+    def extend(self, saved: dict, close: np.ndarray, n) -> dict:
+        new = close[n:]
+        features = dict()
+        for span in self.SMA:
+            features[f'{span}SMA'] = np.concatenate([saved[f'{span}SMA'], sma_extend(close, n, span)])
+        for span in self.EMA:
+            ema, features[f'{span}EMA_state'] = ewm_extend(new, saved[f'{span}EMA_state'], span)
+            features[f'{span}EMA'] = np.concatenate([saved[f'{span}EMA'], ema])
+        if not 0 in self.MACD:
+            ema_short, features['MACD_short_state'] = ewm_extend(new, saved['MACD_short_state'], self.MACD[0])
+            ema_long, features['MACD_long_state'] = ewm_extend(new, saved['MACD_long_state'], self.MACD[1])
+            macd = ema_short - ema_long
+            signal, features['MACD_Signal_state'] = ewm_extend(macd, saved['MACD_Signal_state'], self.MACD[2])
+            features['MACD'] = np.concatenate([saved['MACD'], macd])
+            features['MACD_Signal'] = np.concatenate([saved['MACD_Signal'], signal])
+        return features
+
+    def read(self) -> dict:
+        try:
+            with np.load(self.file) as npz:
+                return dict(npz)
+        except (FileNotFoundError, ValueError, OSError):
+            return None
+
+    def write(self, features: dict, dates: np.ndarray, close: np.ndarray):
+        self.path.mkdir(parents=True, exist_ok=True)
+        tmp = self.file.with_suffix(f'.{os.getpid()}.tmp')
+        with open(tmp, 'wb') as f:
+            np.savez(f, Date=dates, Close=close, **features)
+        os.replace(tmp, self.file)
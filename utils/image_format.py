@@ -0,0 +1,61 @@
+import numpy as np
+from PIL import Image
+import io
+
+
+image_formats = ['png', 'webp', 'npy']
+
+
+def encode_image(image: np.ndarray, fmt='png', compress_level=6) -> bytes:
+    '''
+    Encode RGB image once
+    image: np.ndarray
+        uint8 [height, width, 3]
+    fmt: str
+        png / webp (lossless) / npy (raw array)
+    compress_level: int
+        png compression, 0 (fastest, largest) ~ 9 (slowest, smallest)
+    '''
+    buffer = io.BytesIO()
+    if fmt == 'npy':
+        np.save(buffer, image)
+    elif fmt == 'webp':
+        Image.fromarray(image).save(buffer, format='webp', lossless=True)
+    elif fmt == 'png':
+        Image.fromarray(image).save(buffer, format='png', compress_level=compress_level)
+    else:
+        raise ValueError(f'unknown image format: {fmt}')
+    return buffer.getvalue()
+
+
+def decode_image(data: bytes, fmt='png') -> np.ndarray:
+    '''
+    Decode image encoded by encode_image as uint8 [height, width, 3]
+    '''
+    if fmt == 'npy':
+        return np.load(io.BytesIO(data))
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert('RGB'))
+
+
+def save_image(image: np.ndarray, path, compress_level=6):
+    '''
+    Save RGB image in the format of path suffix (png / webp / npy) (see encode_image)
+    '''
+    path.write_bytes(encode_image(image, path.suffix[1:], compress_level))
+
+
+def load_image(path) -> np.ndarray:
+    '''
+    Load RGB image saved by save_image as uint8 [height, width, 3]
+    '''
+    return decode_image(path.read_bytes(), path.suffix[1:])
+
+
+def figure_image(fig) -> np.ndarray:
+    '''
+    Render matplotlib figure and take its canvas buffer as RGB
+    '''
+    fig.canvas.draw()
+    rgba = np.asarray(fig.canvas.buffer_rgba())
+    return np.ascontiguousarray(rgba[..., :3])
@@ -0,0 +1,120 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+import os
+
+
+label_columns = ['Date', 'Ticker', 'Label']
+label_formats = ['npz', 'parquet', 'csv']  # priority when format is not given
+
+
+class LabelStore:
+    def __init__(self, path: Path, fmt=None) -> None:
+        '''
+        Labeling partitioned by ticker ({path}/{ticker}.{fmt}: Date, Ticker, Label sorted by Date)
+        Each ticker is written to its own file, so processes can label different tickers at the same time
+        path: pathlib.Path
+            directory of partitions (ex. Labeling/CNN/Kospi/4%_01_2/labeling_20_5)
+        fmt: str
+            npz (default) / parquet (pyarrow is required) / csv
+            If None, the format of saved partitions
+        '''
+        self.path = path
+        self.fmt = fmt if fmt else self.detect_format()
+
+    def detect_format(self) -> str:
+        for fmt in label_formats:
+            if next(self.path.glob(f'*.{fmt}'), None) is not None:
+                return fmt
+        return 'npz'
+
+    def exists(self) -> bool:
+        return self.path.exists() and next(self.path.glob(f'*.{self.fmt}'), None) is not None
+
+    def tickers(self) -> list:
+        return sorted(file.name[:-len(self.fmt) - 1] for file in self.path.glob(f'*.{self.fmt}'))
+
+    def write(self, ticker, labeling: pd.DataFrame):
+        '''
+        Replace the partition of ticker
+        labeling: pd.DataFrame
+            Date, Ticker, Label
+        '''
+        self.path.mkdir(parents=True, exist_ok=True)
+        labeling = labeling.sort_values('Date', kind='stable')
+        file = self.path / f'{ticker}.{self.fmt}'
+        tmp = self.path / f'{ticker}.{os.getpid()}.tmp'
+        if self.fmt == 'npz':
+            with open(tmp, 'wb') as f:
+                np.savez(
+                    f,
+                    Date=labeling['Date'].to_numpy(dtype='U10'),
+                    Ticker=labeling['Ticker'].to_numpy(dtype=str),
+                    Label=labeling['Label'].to_numpy(dtype=np.int64),
+                )
+        elif self.fmt == 'parquet':
+            labeling[label_columns].to_parquet(tmp, index=False)
+        else:
+            labeling[label_columns].to_csv(tmp, index=False)
+        os.replace(tmp, file)  # readers never see a partial partition
+
+    def migrate(self, file: Path) -> bool:
+        '''
+        Move labeling of a single csv file (old version, ex. labeling_20_5.csv) into partitions
+        Rows already in partitions are kept. The file is renamed to {name}.migrated.csv
+        The file is claimed first by renaming it to {name}.{pid}.migrating,
+        so only one of the processes labeling at the same time migrates it
+        
+        return: bool
+            False if the file is already claimed (or migrated) by another process
+        '''
+        claimed = file.with_name(f'{file.stem}.{os.getpid()}.migrating')
+        try:
+            os.replace(file, claimed)
+        except FileNotFoundError:
+            return False
+        labeling = pd.read_csv(claimed, index_col=False, dtype={'Date': str, 'Ticker': str})
+        for ticker, rows in labeling.groupby('Ticker', sort=False):
+            if (self.path / f'{ticker}.{self.fmt}').exists():
+                rows = pd.concat([rows, self.read(ticker)]).drop_duplicates(subset=['Date'], keep='last')
+            self.write(ticker, rows.astype({'Label': np.int64}))
+        os.replace(claimed, file.with_name(f'{file.stem}.migrated.csv'))
+        return True
+
+    def read(self, ticker, start=None, end=None, columns=None) -> pd.DataFrame:
+        '''
+        labeling of ticker (start <= Date < end)
+        Only the rows in the date range and the columns are read from npz and parquet partitions
+        '''
+        columns = columns if columns else label_columns
+        file = self.path / f'{ticker}.{self.fmt}'
+        if self.fmt == 'npz':
+            with np.load(file) as npz:
+                dates = npz['Date']
+                i = np.searchsorted(dates, start, side='left') if start else 0
+                j = np.searchsorted(dates, end, side='left') if end else len(dates)
+                return pd.DataFrame({column: npz[column][i:j] for column in columns})
+        elif self.fmt == 'parquet':
+            filters = [('Date', '>=', start)] if start else []
+            filters += [('Date', '<', end)] if end else []
+            return pd.read_parquet(file, columns=columns, filters=filters or None)
+        labeling = pd.read_csv(file, index_col=False, dtype=str, usecols=list(set(columns) | {'Date'}))
+        valid = np.ones(len(labeling), dtype=bool)
+        if start:
+            valid &= (labeling['Date'] >= start).to_numpy()
+        if end:
+            valid &= (labeling['Date'] < end).to_numpy()
+        return labeling.loc[valid, columns]
+
+    def load(self, start=None, end=None, columns=None, tickers=None) -> pd.DataFrame:
+        '''
+        labeling of every ticker (start <= Date < end) in ticker order
+        tickers: list
+            tickers to read. If None, every ticker in store
+        '''
+        columns = columns if columns else label_columns
+        tickers = tickers if tickers is not None else self.tickers()
+        parts = [self.read(ticker, start, end, columns) for ticker in tickers]
+        if not parts:
+            return pd.DataFrame(columns=columns)
+        return pd.concat(parts, ignore_index=True)
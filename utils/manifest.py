@@ -0,0 +1,88 @@
+'''
+Manifest of completed charts
+
+Every process appends to its own part file ({pid}-{number}.csv: Ticker, Date, Config, Status, Size),
+so a run can be resumed by skipping charts which are already done with the same chart setting.
+Status is done, or failed when drawing or saving the chart raised an error (it is made again when resumed).
+'''
+from pathlib import Path
+import pandas as pd
+import os
+
+
+manifest_columns = ['Ticker', 'Date', 'Config', 'Status', 'Size']
+
+
+class ManifestWriter:
+    def __init__(self, path: Path, prefix=None) -> None:
+        '''
+        path: pathlib.Path
+            directory of manifest part files
+        prefix: str
+            prefix of part file names. If None, process id
+        '''
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix if prefix else str(os.getpid())
+        self.file = None
+
+    def open(self):
+        number = 0
+        while (self.path / f'{self.prefix}-{number:05d}.csv').exists():
+            number += 1
+        self.file = open(self.path / f'{self.prefix}-{number:05d}.csv', 'w')
+        self.file.write(','.join(manifest_columns) + '\n')
+
+    def write(self, ticker, last_date, config, size, status='done'):
+        '''
+        config: str
+            hash of chart setting (see CandlstickChart.config_hash)
+        size: int
+            bytes of saved chart
+        status: str
+            done / failed
+        '''
+        if self.file is None:
+            self.open()
+        self.file.write(f'{ticker},{last_date},{config},{status},{size}\n')
+        self.file.flush()  # a killed run keeps every finished chart
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+def load_manifest(path: Path) -> pd.DataFrame:
+    '''
+    Merge manifest part files in path. If a chart is recorded more than once, the latest record is kept
+    '''
+    files = sorted(path.glob('*.csv'), key=lambda f: f.stat().st_mtime)
+    parts = [
+        pd.read_csv(file, dtype={'Ticker': str, 'Date': str, 'Config': str, 'Status': str}, on_bad_lines='skip')
+        for file in files
+    ]
+    if not parts:
+        return pd.DataFrame(columns=manifest_columns)
+    manifest = pd.concat(parts, ignore_index=True).dropna(subset=['Ticker', 'Date'])
+    return manifest.drop_duplicates(subset=['Ticker', 'Date'], keep='last').reset_index(drop=True)
+
+
+manifest_writers = dict()  # manifest writers of this process
+def manifest_writer(path: Path) -> ManifestWriter:
+    '''
+    ManifestWriter of the directory in this process
+    '''
+    key = (str(path), os.getpid())
+    if key not in manifest_writers:
+        manifest_writers[key] = ManifestWriter(path)
+    return manifest_writers[key]
+
+
+def close_manifests():
+    '''
+    Close every manifest writer of this process
+    '''
+    for writer in manifest_writers.values():
+        writer.close()
+    manifest_writers.clear()
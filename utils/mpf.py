@@ -1,14 +1,15 @@
 from __future__ import (absolute_import, division, print_function,
                         unicode_literals)
 
+import numpy as np
 from matplotlib import colors as mcolors
-from matplotlib.collections import PolyCollection
+from matplotlib.collections import LineCollection, PolyCollection
 from matplotlib.lines import Line2D
 from matplotlib.patches import Rectangle
 
 
 def candlestick_ochl(ax, quotes, width=0.2, colorup='k', colordown='r',
-                     alpha=1.0):
+                     alpha=1.0, collection=False):
     """
     Plot the time, open, close, high, low as a vertical line ranging
     from low to high.  Use a rectangular bar to represent the
@@ -30,19 +31,24 @@ def candlestick_ochl(ax, quotes, width=0.2, colorup='k', colordown='r',
          the color of the rectangle where close <  open
     alpha : float
         the rectangle alpha level
+    collection : bool
+        draw all wicks as one `LineCollection` and all bodies as one
+        `PolyCollection` instead of an artist per candle
     Returns
     -------
     ret : tuple
         returns (lines, patches) where lines is a list of lines
-        added and patches is a list of the rectangle patches added
+        added and patches is a list of the rectangle patches added.
+        If collection, (`LineCollection`, `PolyCollection`) whose
+        i-th segment / polygon is the wick / body of i-th candle
     """
     return _candlestick(ax, quotes, width=width, colorup=colorup,
                         colordown=colordown,
-                        alpha=alpha, ochl=True)
+                        alpha=alpha, ochl=True, collection=collection)
 
 
 def candlestick_ohlc(ax, quotes, width=0.2, colorup='k', colordown='r',
-                     alpha=1.0):
+                     alpha=1.0, collection=False):
     """
     Plot the time, open, high, low, close as a vertical line ranging
     from low to high.  Use a rectangular bar to represent the
@@ -64,19 +70,24 @@ def candlestick_ohlc(ax, quotes, width=0.2, colorup='k', colordown='r',
          the color of the rectangle where close <  open
     alpha : float
         the rectangle alpha level
+    collection : bool
+        draw all wicks as one `LineCollection` and all bodies as one
+        `PolyCollection` instead of an artist per candle
     Returns
     -------
     ret : tuple
         returns (lines, patches) where lines is a list of lines
-        added and patches is a list of the rectangle patches added
+        added and patches is a list of the rectangle patches added.
+        If collection, (`LineCollection`, `PolyCollection`) whose
+        i-th segment / polygon is the wick / body of i-th candle
     """
     return _candlestick(ax, quotes, width=width, colorup=colorup,
                         colordown=colordown,
-                        alpha=alpha, ochl=False)
+                        alpha=alpha, ochl=False, collection=collection)
 
 
 def _candlestick(ax, quotes, width=0.2, colorup='k', colordown='r',
-                 alpha=1.0, ochl=True):
+                 alpha=1.0, ochl=True, collection=False):
     """
     Plot the time, open, high, low, close as a vertical line ranging
     from low to high.  Use a rectangular bar to represent the
@@ -101,15 +112,25 @@ def _candlestick(ax, quotes, width=0.2, colorup='k', colordown='r',
         the rectangle alpha level
     ochl: bool
         argument to select between ochl and ohlc ordering of quotes
+    collection : bool
+        draw all wicks as one `LineCollection` and all bodies as one
+        `PolyCollection` instead of an artist per candle
     Returns
     -------
     ret : tuple
         returns (lines, patches) where lines is a list of lines
-        added and patches is a list of the rectangle patches added
+        added and patches is a list of the rectangle patches added.
+        If collection, (`LineCollection`, `PolyCollection`) whose
+        i-th segment / polygon is the wick / body of i-th candle
     """
 
     OFFSET = width / 2.0
 
+    if collection:
+        return _candlestick_collection(ax, quotes, width=width,
+                                       colorup=colorup, colordown=colordown,
+                                       alpha=alpha, ochl=ochl)
+
     lines = []
     patches = []
 
@@ -156,6 +177,77 @@ def _candlestick(ax, quotes, width=0.2, colorup='k', colordown='r',
     return lines, patches
 
 
+def _candlestick_collection(ax, quotes, width=0.2, colorup='k', colordown='r',
+                            alpha=1.0, ochl=True):
+    """
+    Batched `_candlestick`. Wicks are one `LineCollection` and bodies are
+    one `PolyCollection`, drawn in the same order and style as the
+    per-candle artists (bodies under wicks).
+    Returns
+    -------
+    ret : tuple
+        (`LineCollection`, `PolyCollection`) of wicks and bodies
+    """
+
+    OFFSET = width / 2.0
+
+    quotes = np.asarray(quotes, dtype=float)
+    if ochl:
+        t, open, close, high, low = quotes[:, :5].T
+    else:
+        t, open, high, low, close = quotes[:, :5].T
+
+    colors = candle_colors(open, close, colorup, colordown)
+    segments, verts = candle_geometry(t, open, close, high, low, OFFSET)
+
+    lines = LineCollection(
+        segments,
+        colors=colors,
+        linewidths=0.5,
+        antialiaseds=True,
+        zorder=2,  # Line2D
+    )
+
+    patches = PolyCollection(
+        verts,
+        facecolors=colors,
+        edgecolors=colors,
+        zorder=1,  # Patch
+    )
+    patches.set_alpha(alpha)
+
+    ax.add_collection(patches)
+    ax.add_collection(lines)
+    ax.autoscale_view()
+
+    return lines, patches
+
+
+def candle_colors(opens, closes, colorup='k', colordown='r'):
+    """
+    RGB colors of candles. colorup if close >= open, else colordown
+    """
+    colorup = mcolors.to_rgb(colorup)
+    colordown = mcolors.to_rgb(colordown)
+    return np.where((np.asarray(closes) >= np.asarray(opens))[:, None], colorup, colordown)
+
+
+def candle_geometry(t, opens, closes, highs, lows, offset):
+    """
+    wick segments [n, 2, 2] and body polygons [n, 4, 2] of candles
+    """
+    t, opens, closes, highs, lows = [np.asarray(a, dtype=float) for a in (t, opens, closes, highs, lows)]
+    lower = np.minimum(opens, closes)
+    upper = np.maximum(opens, closes)
+    segments = np.stack([np.stack([t, lows], axis=1), np.stack([t, highs], axis=1)], axis=1)
+    left, right = t - offset, t + offset
+    verts = np.stack([
+        np.stack([left, lower], axis=1), np.stack([right, lower], axis=1),
+        np.stack([right, upper], axis=1), np.stack([left, upper], axis=1),
+    ], axis=1)
+    return segments, verts
+
+
 def volume_overlay(ax, opens, closes, volumes,
                    colorup='k', colordown='r',
                    width=4, alpha=1.0):
@@ -1,4 +1,9 @@
 from typing import List
+import inspect
+import ast
+import numpy as np
+import pandas as pd
+from .trading_dates import trading_dates
 
 class CandleStick:
     def __init__(self, open=0, high=0, low=0, close=0) -> None:
@@ -19,6 +24,46 @@ class CandleStick:
         return self.open > self.close
 
 
+class Candles:
+    def __init__(self, open, high, low, close) -> None:
+        '''
+        Candlesticks of a price series as arrays (vectorized CandleStick)
+        open, high, low, close: np.ndarray
+            prices of each trade date
+        '''
+        self.open = np.asarray(open, dtype=np.float64)
+        self.high = np.asarray(high, dtype=np.float64)
+        self.low = np.asarray(low, dtype=np.float64)
+        self.close = np.asarray(close, dtype=np.float64)
+        
+        self.body = self.open - self.close
+        self.upper_shadow = self.high - np.maximum(self.open, self.close)
+        self.lower_shadow = np.minimum(self.open, self.close) - self.low
+        self.candle = self.high - self.low
+    
+    @classmethod
+    def from_frame(cls, data: pd.DataFrame):
+        return cls(*(data[column].to_numpy() for column in ['Open', 'High', 'Low', 'Close']))
+    
+    def __len__(self) -> int:
+        return len(self.open)
+    
+    def bullish(self):
+        return self.open < self.close
+    
+    def bearish(self):
+        return self.open > self.close
+    
+    def shift(self, n, length):
+        '''
+        candles from n-th trade date to n + length (views)
+        '''
+        shifted = Candles.__new__(Candles)
+        for key, value in self.__dict__.items():
+            setattr(shifted, key, value[n:n + length])
+        return shifted
+
+
 class Pattern:
     def __init__(self, num) -> None:
         '''
@@ -29,12 +74,12 @@ class Pattern:
         self.conditions = list()
     
     def __call__(self, date, section) -> bool:
-        dates = section.index.tolist()
-        i = dates.index(date)
+        dates = trading_dates(section.index)
+        i = dates.position(date)
         
         if i < (len(dates) - (self.num - 1)):
-            candlesticks = [CandleStick(*tuple(section.loc[dates[i+n], 'Open':'Close'].tolist())) \
-                for n in range(self.num)]
+            prices = section.loc[:, 'Open':'Close'].iloc[i:i+self.num].to_numpy().tolist()
+            candlesticks = [CandleStick(*price) for price in prices]
             return self.condition_check(candlesticks)
         return False
     
@@ -43,6 +88,18 @@ class Pattern:
         for condition in self.conditions:
             check.append(condition(candlesticks))
         return False not in check  # return True when satisfying all condition
+    
+    def spec(self) -> str:
+        '''
+        pattern spec of conditions (see PatternSpec)
+        '''
+        return ' and '.join(f'({condition.spec()})' for condition in self.conditions)
+    
+    def hits(self, candles: Candles) -> np.ndarray:
+        '''
+        whether the pattern starts at each trade date (the same as __call__ of every date)
+        '''
+        return compile_spec(self.__class__.__name__, self.spec(), self.num).hits(candles)
             
 
 class Bullish:
@@ -64,6 +121,12 @@ class Bullish:
         for pattern in self.patterns:
             result[pattern.__class__.__name__] = pattern(date, section)
         return result
+
+    def hits(self, candles: Candles) -> np.ndarray:
+        '''
+        bool [trade dates, patterns] whether each pattern starts at each trade date
+        '''
+        return np.stack([pattern.hits(candles) for pattern in self.patterns], axis=1)
     
     class BullishHarami(Pattern):
         def __init__(self, num=2) -> None:
@@ -137,6 +200,12 @@ class Bearish:
             result[pattern.__class__.__name__] = pattern(date, section)
         return result
 
+    def hits(self, candles: Candles) -> np.ndarray:
+        '''
+        bool [trade dates, patterns] whether each pattern starts at each trade date
+        '''
+        return np.stack([pattern.hits(candles) for pattern in self.patterns], axis=1)
+
     class BearishHarami(Pattern):
         def __init__(self, num=2) -> None:
             super().__init__(num)
@@ -191,6 +260,28 @@ class Bearish:
             self.conditions.append(Condition(high_under_close, 1, 2))
 
 
+def pattern_hits(data: pd.DataFrame, specs: dict=None):
+    '''
+    Bullish and Bearish patterns of every trade date at once
+    data: pd.DataFrame
+        historical data (Open, High, Low, Close)
+    specs: dict
+        {name: pattern spec} of additional patterns (see PatternSpec). Their labels follow Bearish patterns
+    return: (list, np.ndarray)
+        pattern names (index is label), bool [trade dates, patterns] whether each pattern starts at each trade date
+    '''
+    bullish = Bullish()
+    bearish = Bearish()
+    duplicated = sorted(set(specs or dict()) & (set(bullish.nums) | set(bearish.nums)))
+    if duplicated:
+        raise ValueError(f'pattern names are already used by Bullish or Bearish patterns: {", ".join(duplicated)}')
+    extra = [compile_spec(name, spec) for name, spec in (specs or dict()).items()]
+    names = list(bullish.nums.keys()) + list(bearish.nums.keys()) + [pattern.name for pattern in extra]
+    candles = Candles.from_frame(data)
+    hits = [bullish.hits(candles), bearish.hits(candles)] + [pattern.hits(candles)[:, None] for pattern in extra]
+    return names, np.concatenate(hits, axis=1)
+
+
 class Condition:
     def __init__(self, func, *args) -> None:
         self.func = func
@@ -198,6 +289,177 @@ class Condition:
     
     def __call__(self, candlesticks: List[CandleStick]) -> bool:
         return self.func(candlesticks, *self.args)
+    
+    def spec(self) -> str:
+        '''
+        pattern spec of the condition (see condition_specs)
+        '''
+        arguments = inspect.signature(self.func).bind(None, *self.args)
+        arguments.apply_defaults()
+        values = {k: repr(v) for k, v in arguments.arguments.items() if k != 'candlesticks'}
+        return condition_specs[self.func.__name__].format(**values)
+
+
+class PatternSpec:
+    variables = ['open', 'high', 'low', 'close', 'body', 'upper_shadow', 'lower_shadow', 'candle', 'bullish', 'bearish']
+    
+    def __init__(self, name, spec: str, num=None) -> None:
+        '''
+        Candlestick pattern written as one expression, compiled once into NumPy operations over shifted arrays
+        name: str
+            pattern name
+        spec: str
+            boolean expression of {variable}[n], the variable of n-th candlestick of the pattern (n >= 0)
+            variables: open, high, low, close, body (open - close), upper_shadow, lower_shadow, candle (high - low),
+                       bullish, bearish
+            operators: and, or, not, comparison (<, <=, >, >=, ==, !=), +, -, *, /, parentheses and numbers
+            ex. 'bearish[0] and bullish[1] and close[0] < open[1] and body[0] > 0.6 * candle[0]'
+        num: int
+            the number of candlesticks in the pattern. If None, the last candlestick in spec
+        '''
+        self.name = name
+        self.spec = spec
+        tree = ast.parse(spec, mode='eval')
+        if SpecTransformer.kind(tree.body) != 'bool':
+            raise ValueError(f'{name}: pattern spec must be a condition, not a number ({spec})')
+        self.terms = set()
+        tree = ast.fix_missing_locations(SpecTransformer(self).visit(tree))
+        self.code = compile(tree, f'<pattern {name}>', 'eval')
+        offsets = [n for _, n in self.terms]
+        self.num = num if num else max(offsets, default=0) + 1
+        if offsets and max(offsets) >= self.num:
+            raise ValueError(f'{name}: candlestick {max(offsets)} is out of {self.num} candlesticks')
+    
+    def hits(self, candles: Candles) -> np.ndarray:
+        '''
+        whether the pattern starts at each trade date
+        '''
+        hits = np.zeros(len(candles), dtype=bool)
+        length = len(candles) - (self.num - 1)
+        if length > 0:
+            namespace = dict()
+            for variable, n in self.terms:
+                shifted = candles.shift(n, length)
+                namespace[f'{variable}_{n}'] = getattr(shifted, variable)() if variable in ['bullish', 'bearish'] \
+                    else getattr(shifted, variable)
+            hits[:length] = np.broadcast_to(eval(self.code, {'__builtins__': {}}, namespace), (length,))
+        return hits
+
+
+compiled_specs = dict()  # compiled pattern specs of this process
+def compile_spec(name, spec: str, num=None) -> PatternSpec:
+    '''
+    PatternSpec compiled once per process
+    '''
+    key = (name, spec, num)
+    if key not in compiled_specs:
+        compiled_specs[key] = PatternSpec(name, spec, num)
+    return compiled_specs[key]
+
+
+class SpecTransformer(ast.NodeTransformer):
+    '''
+    Validate pattern spec and rewrite it as NumPy expression
+    variable[n] -> variable_n, and / or / not -> & / | / ~, a < b < c -> (a < b) & (b < c)
+    Bitwise operators are only valid for conditions, so operands of and / or / not must be conditions
+    and operands of arithmetic and order comparisons must be numbers
+    '''
+    operators = (ast.Add, ast.Sub, ast.Mult, ast.Div, ast.USub, ast.UAdd, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq)
+    symbols = {ast.Add: '+', ast.Sub: '-', ast.Mult: '*', ast.Div: '/', ast.USub: '-', ast.UAdd: '+'}
+    
+    def __init__(self, spec: PatternSpec) -> None:
+        self.pattern = spec
+    
+    @staticmethod
+    def kind(node) -> str:
+        '''
+        bool (condition) or number of the spec expression
+        '''
+        if isinstance(node, (ast.BoolOp, ast.Compare)) or (isinstance(node, ast.UnaryOp) and isinstance(node.op, ast.Not)):
+            return 'bool'
+        if isinstance(node, ast.Subscript) and isinstance(node.value, ast.Name) and node.value.id in ['bullish', 'bearish']:
+            return 'bool'
+        return 'number'
+    
+    def expect(self, nodes, kind, operator):
+        for node in nodes:
+            if self.kind(node) != kind:
+                expected = 'a condition' if kind == 'bool' else 'a number'
+                raise ValueError(f'{self.pattern.name}: operand of {operator} must be {expected} ({ast.unparse(node)})')
+    
+    def generic_visit(self, node):
+        if not isinstance(node, (ast.Expression, ast.BinOp, ast.UnaryOp, ast.Constant, ast.Load) + self.operators):
+            raise ValueError(f'{self.pattern.name}: {type(node).__name__} is not allowed in pattern spec')
+        if isinstance(node, ast.Constant) and (isinstance(node.value, bool) or not isinstance(node.value, (int, float))):
+            raise ValueError(f'{self.pattern.name}: only numbers are allowed as constant ({node.value!r})')
+        return super().generic_visit(node)
+    
+    def visit_Subscript(self, node):
+        index = node.slice.value if isinstance(node.slice, ast.Constant) else None
+        if not isinstance(node.value, ast.Name) or node.value.id not in PatternSpec.variables:
+            raise ValueError(f'{self.pattern.name}: unknown variable {ast.unparse(node.value)}')
+        if isinstance(index, bool) or not isinstance(index, int) or index < 0:
+            raise ValueError(f'{self.pattern.name}: candlestick index must be an integer >= 0 ({ast.unparse(node)})')
+        self.pattern.terms.add((node.value.id, index))
+        return ast.copy_location(ast.Name(id=f'{node.value.id}_{index}', ctx=ast.Load()), node)
+    
+    def visit_Name(self, node):
+        raise ValueError(f'{self.pattern.name}: {node.id} needs candlestick index (ex. {node.id}[0])')
+    
+    def visit_BoolOp(self, node):
+        self.expect(node.values, 'bool', 'and' if isinstance(node.op, ast.And) else 'or')
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        values = [self.visit(value) for value in node.values]
+        expression = values[0]
+        for value in values[1:]:
+            expression = ast.BinOp(left=expression, op=op, right=value)
+        return ast.copy_location(expression, node)
+    
+    def visit_UnaryOp(self, node):
+        if isinstance(node.op, ast.Not):
+            self.expect([node.operand], 'bool', 'not')
+            return ast.copy_location(ast.UnaryOp(op=ast.Invert(), operand=self.visit(node.operand)), node)
+        self.expect([node.operand], 'number', self.symbols.get(type(node.op), 'sign'))
+        return self.generic_visit(node)
+    
+    def visit_BinOp(self, node):
+        self.expect([node.left, node.right], 'number', self.symbols.get(type(node.op), type(node.op).__name__))
+        return self.generic_visit(node)
+    
+    def visit_Compare(self, node):
+        for op in node.ops:
+            self.generic_visit(op)
+        operands = [node.left] + node.comparators
+        if all(isinstance(op, (ast.Eq, ast.NotEq)) for op in node.ops):  # conditions can be compared by == and !=
+            self.expect(operands, self.kind(node.left), 'comparison')
+        else:
+            self.expect(operands, 'number', 'comparison')
+        operands = [self.visit(operand) for operand in [node.left] + node.comparators]
+        comparisons = [
+            ast.Compare(left=left, ops=[op], comparators=[right])
+            for left, op, right in zip(operands[:-1], node.ops, operands[1:])
+        ]
+        expression = comparisons[0]
+        for comparison in comparisons[1:]:
+            expression = ast.BinOp(left=expression, op=ast.BitAnd(), right=comparison)
+        return ast.copy_location(expression, node)
+
+
+condition_specs = {  # pattern spec of each condition function (arguments are formatted by name)
+    'bullish_candle': 'bullish[{n}]',
+    'bearish_candle': 'bearish[{n}]',
+    'close_under_open': 'close[{n1}] < open[{n2}]',
+    'close_above_open': 'close[{n1}] > open[{n2}]',
+    'high_under_open': 'high[{n1}] < open[{n2}]',
+    'high_under_close': 'high[{n1}] < close[{n2}]',
+    'lower': 'low[{n1}] < low[{n2}]',
+    'higher': 'high[{n1}] > high[{n2}]',
+    'bigger': 'body[{n1}] > body[{n2}]',
+    'big_body': 'body[{n}] > {ratio} * candle[{n}]',
+    'small_body': 'body[{n}] < {ratio} * candle[{n}]',
+    'gravestone': '(upper_shadow[{n}] * {ratio2} > body[{n}] * {ratio1}) and (upper_shadow[{n}] * {ratio3} > lower_shadow[{n}] * {ratio1})',
+    'dragonfly': '(lower_shadow[{n}] * {ratio2} > body[{n}] * {ratio3}) and (upper_shadow[{n}] * {ratio2} > body[{n}] * {ratio1})',
+}
 
 
 def bullish_candle(candlesticks: List[CandleStick], n=0):
@@ -0,0 +1,564 @@
+'''
+NumPy rasterizer of candlestick chart
+
+Draw the same chart as matplotlib CandlstickChart (subplot layout, autoscale margins,
+line widths in points, style background) straight into uint8 RGB buffer without figure.
+Candles and volume bars are snapped to pixels. Moving average and MACD lines are antialiased.
+Many charts (windows of a ticker) are drawn at once, so the cost per chart is mostly pixels, not numpy calls.
+'''
+import numpy as np
+import pandas as pd
+from matplotlib import colors as mcolors
+from matplotlib import style as mstyle
+from matplotlib import rcParamsDefault
+
+
+DPI = 100  # figure dpi of CandlstickChart (figsize = size / 100)
+MARGIN = 0.05  # axes.xmargin, axes.ymargin
+WSPACE = 0.2  # figure.subplot.wspace
+WICK_WIDTH = 0.5  # linewidth of candle wick (see candlestick_ochl)
+EDGE_WIDTH = 1.0  # linewidth of candle body edge (patch.linewidth)
+VOLUME_EDGE_WIDTH = 0.5  # linewidth of volume bar edge (see volume_overlay)
+MACD_WIDTH = 1.0
+
+
+def to_pixels(linewidth) -> float:
+    '''
+    linewidth (points) to pixels
+    '''
+    return linewidth * DPI / 72
+
+
+def to_rgb(color) -> np.ndarray:
+    return np.round(np.array(mcolors.to_rgb(color)) * 255).astype(np.uint8)
+
+
+def background(style) -> np.ndarray:
+    '''
+    saved figure background color of matplotlib style
+    '''
+    rc = rcParamsDefault.copy()
+    rc.update(mstyle.library.get(style, {}))
+    facecolor = rc['savefig.facecolor']
+    if facecolor == 'auto':
+        facecolor = rc['figure.facecolor']
+    return to_rgb(facecolor)
+
+
+def axes_boxes(size, volume, MACD) -> list:
+    '''
+    [left, bottom, width, height] pixels of each subplot (see candlestick.subplots)
+    tight_layout(pad=0) removes the figure padding and the space between rows
+    '''
+    width, height = size
+    count = [volume, 0 not in MACD].count(True)
+    if count == 0:
+        return [(0, 0, width, height)]
+    top = (0, height / 2, width, height / 2)
+    if count == 1:
+        return [top, (0, 0, width, height / 2)]
+    w = width / (2 + WSPACE)
+    return [top, (0, 0, w, height / 2), (width - w, 0, w, height / 2)]
+
+
+def nonsingular(lo, hi, expander=0.05):
+    '''
+    expand zero range limits (same as matplotlib.transforms.nonsingular)
+    lo, hi: np.ndarray
+        limits of each row
+    '''
+    singular = hi - lo <= np.maximum(np.abs(lo), np.abs(hi)) * 1e-15
+    zero = singular & (lo == 0) & (hi == 0)
+    lo = np.where(zero, -expander, np.where(singular, lo - expander * np.abs(lo), lo))
+    hi = np.where(zero, expander, np.where(singular, hi + expander * np.abs(hi), hi))
+    return lo, hi
+
+
+def autoscale_rows(values: np.ndarray) -> np.ndarray:
+    '''
+    limits [rows, (min, max)] of each row with matplotlib autoscale margins. NaN is ignored
+    '''
+    values = np.asarray(values, dtype=np.float64)
+    finite = np.isfinite(values)
+    lo = np.where(finite, values, np.inf).min(axis=1)
+    hi = np.where(finite, values, -np.inf).max(axis=1)
+    empty = ~finite.any(axis=1)
+    lo[empty], hi[empty] = 0., 1.
+    lo, hi = nonsingular(lo, hi)
+    delta = (hi - lo) * MARGIN
+    return np.stack([lo - delta, hi + delta], axis=1)
+
+
+def autoscale(values) -> tuple:
+    '''
+    limits of values with matplotlib autoscale margins. NaN is ignored
+    '''
+    lo, hi = autoscale_rows(np.ravel(values)[None])[0]
+    return lo, hi
+
+
+def windows(values: np.ndarray, period, ends) -> np.ndarray:
+    '''
+    [len(ends), period] windows of values which end at each position of ends
+    '''
+    return np.lib.stride_tricks.sliding_window_view(values, period)[np.asarray(ends) - period + 1]
+
+
+class Viewport:
+    def __init__(self, size, box, xlim, ylim) -> None:
+        '''
+        data -> pixel transform of a subplot
+        size: [width, height]
+            the size of chart image
+        box: [left, bottom, width, height]
+            pixels of subplot
+        xlim, ylim: (min, max) or [charts, (min, max)]
+            data limits of subplot. Limits of several charts transform [charts, n] values at once
+        '''
+        self.height = size[1]
+        self.box = box
+        self.xlim = np.asarray(xlim, dtype=np.float64)[..., None]
+        self.ylim = np.asarray(ylim, dtype=np.float64)[..., None]
+
+    def x(self, x) -> np.ndarray:
+        left, _, width, _ = self.box
+        lo, hi = self.xlim[..., 0, :], self.xlim[..., 1, :]
+        return left + (np.asarray(x, dtype=np.float64) - lo) / (hi - lo) * width
+
+    def y(self, y) -> np.ndarray:
+        '''
+        image row (from top) of y
+        '''
+        _, bottom, _, height = self.box
+        lo, hi = self.ylim[..., 0, :], self.ylim[..., 1, :]
+        return self.height - (bottom + (np.asarray(y, dtype=np.float64) - lo) / (hi - lo) * height)
+
+
+def pack(colors) -> np.ndarray:
+    '''
+    uint8 RGB colors [..., 3] to little endian RGBX uint32 [...]
+    '''
+    colors = np.asarray(colors, dtype=np.uint8)
+    packed = np.zeros(colors.shape[:-1], dtype='<u4')
+    for channel in range(3):
+        packed |= colors[..., channel].astype('<u4') << np.uint32(8 * channel)
+    return packed
+
+
+def expand(start, length, stride=1) -> np.ndarray:
+    '''
+    flat indices of runs (start, start + stride, ... length indices of each run)
+    They are the cumulative sum of stride with a jump to the start of each run
+    '''
+    runs = length > 0
+    start, length = start[runs], length[runs]
+    step = np.full(length.sum(), stride, dtype=np.int64)
+    if len(step):
+        step[0] = start[0]
+        step[(np.cumsum(length) - length)[1:]] = start[1:] - (start + (length - 1) * stride)[:-1]
+    return np.cumsum(step)
+
+
+class Canvas:
+    def __init__(self, blank: np.ndarray, count=1) -> None:
+        '''
+        image buffer of count charts. A pixel is packed RGBX uint32 (see pack),
+        so rectangles are filled with one scalar write per pixel
+        blank: np.ndarray
+            uint8 RGB background image [height, width, 3] of every chart, or packed one [height, width]
+        '''
+        self.blank = blank if blank.ndim == 2 else pack(blank)
+        self.buffer = np.empty((count,) + blank.shape[:2], dtype='<u4')
+        self.coverage = None  # line coverage of each pixel, zero except while a line is drawn
+        self.clear()
+
+    def clear(self):
+        '''
+        fill every chart with the background, so the canvas is reused without allocation
+        '''
+        self.buffer[:] = self.blank
+
+    @property
+    def images(self) -> np.ndarray:
+        '''
+        uint8 RGB images [count, height, width, 3]
+        '''
+        images = np.empty(self.buffer.shape + (3,), dtype=np.uint8)
+        packed = self.buffer.view(np.uint8).reshape(self.buffer.shape + (4,))
+        for channel in range(3):  # copying channel by channel is much faster than one strided copy
+            images[..., channel] = packed[..., channel]
+        return images
+
+    @property
+    def image(self) -> np.ndarray:
+        return self.images[0]
+
+    def rectangles(self, x0, x1, y0, y1, colors):
+        '''
+        fill rectangles of pixel bounds (y from top) in order. Every rectangle covers at least one pixel
+        x0, x1, y0, y1: np.ndarray
+            [n] bounds of the first chart, or [count, n] bounds of each chart
+        colors: uint8 [3], [n, 3] or [count, n, 3]
+        
+        Rectangles of a chart are in increasing x (candles, bars) and a pixel column is covered by
+        at most two of them, so each column is filled with the run of its first and then its last rectangle
+        '''
+        count, height, width = self.buffer.shape
+        c0, c1 = span(np.atleast_2d(x0), np.atleast_2d(x1), width)
+        r0, r1 = span(np.atleast_2d(y0), np.atleast_2d(y1), height)
+        colors = np.broadcast_to(pack(colors), c0.shape)
+        covers = None
+        if (np.diff(c0, axis=1) >= 0).all() and (np.diff(c1, axis=1) >= 0).all():
+            # rectangles first <= i <= last of the chart cover the column (searched in every chart at once)
+            offset = np.arange(count)[:, None] * (width + 1)
+            columns = (np.arange(width) + offset).ravel()
+            last = np.searchsorted((c0 + offset).ravel(), columns, 'right') - 1
+            first = np.searchsorted((c1 + offset).ravel(), columns, 'right')
+            covers = last - first + 1
+        if covers is None or covers.max(initial=0) > 2:
+            for k, i in np.ndindex(c0.shape):
+                self.buffer[k, r0[k, i]:r1[k, i], c0[k, i]:c1[k, i]] = colors[k, i]
+            return
+        
+        start = (np.arange(count)[:, None] * height * width + np.arange(width)).ravel()
+        buffer = self.buffer.reshape(-1)
+        for owner in ([first, last] if covers.max(initial=0) == 2 else [last]):
+            owner = np.clip(owner, 0, c0.size - 1)
+            top = r0.ravel()[owner]
+            length = np.where(covers > 0, r1.ravel()[owner] - top, 0)
+            buffer[expand(start + top * width, length, width)] = np.repeat(colors.ravel()[owner], length)
+
+    def polyline(self, x, y, linewidth, color):
+        '''
+        draw connected line segments of pixel points. NaN breaks the line (same as matplotlib)
+        The line is linewidth thick with round joins and antialiased by pixel coverage:
+        each pixel is blended with the color by how much a linewidth stroke covers its center (at most 1)
+        x, y: np.ndarray
+            [n] points of the first chart, or [count, n] points of each chart
+        linewidth: float
+            pixels
+        '''
+        count, height, width = self.buffer.shape
+        x, y = np.atleast_2d(np.asarray(x, dtype=np.float64), np.asarray(y, dtype=np.float64))
+        x, y = np.broadcast_to(x, (count, x.shape[-1])), np.broadcast_to(y, (count, y.shape[-1]))
+        valid = np.isfinite(x) & np.isfinite(y)
+        chart, j = np.nonzero(valid[:, :-1] & valid[:, 1:])
+        if not len(j):
+            return
+        # segments i and i + step never share a pixel column. Segments are grouped by i % step,
+        # so pixels of each group are contiguous and have no duplicates
+        reach = linewidth / 2 + 1
+        step = separation(x, reach)
+        if step:
+            order = np.argsort(j % step, kind='stable')
+            chart, j = chart[order], j[order]
+            groups = np.searchsorted(j % step, np.arange(step + 1))  # first segment of each group
+        x0, x1, y0, y1 = x[chart, j], x[chart, j + 1], y[chart, j], y[chart, j + 1]
+
+        # columns of each segment, and rows of each column whose pixel centers can be within
+        # the stroke (radius) of the part of the segment within radius of the column center
+        radius = linewidth / 2 + 0.5
+        left, right = np.minimum(x0, x1), np.maximum(x0, x1)
+        c0 = np.clip(np.floor(left - reach), 0, width).astype(np.int64)
+        c1 = np.clip(np.ceil(right + reach), 0, width).astype(np.int64)
+        segment = np.repeat(np.arange(len(j)), c1 - c0)
+        cols = expand(c0, c1 - c0)
+        center = cols + 0.5
+        xa = np.maximum(left[segment], center - radius)
+        xb = np.minimum(right[segment], center + radius)
+        slope = np.divide(y1 - y0, x1 - x0, out=np.zeros_like(x0), where=x1 != x0)[segment]
+        ya = np.where((x1 == x0)[segment], y0[segment], y0[segment] + (xa - x0[segment]) * slope)
+        yb = np.where((x1 == x0)[segment], y1[segment], y0[segment] + (xb - x0[segment]) * slope)
+        r0 = np.clip(np.floor(np.minimum(ya, yb) - reach), 0, height).astype(np.int64)
+        r1 = np.clip(np.ceil(np.maximum(ya, yb) + reach), 0, height).astype(np.int64)
+        r1[xa > xb] = r0[xa > xb]
+        counts = np.bincount(segment, weights=r1 - r0, minlength=len(j)).astype(np.int64)
+        column = np.repeat(np.arange(len(segment)), r1 - r0)
+        rows = expand(r0, r1 - r0)
+        cols, which = cols[column], segment[column]
+
+        # distance from pixel centers to the segment (hypot is much slower than sqrt)
+        dx, dy = x1 - x0, y1 - y0
+        length = np.maximum(dx * dx + dy * dy, np.finfo(np.float64).tiny)[which]  # t = 0 for a zero length segment
+        dx, dy = dx[which], dy[which]
+        px, py = cols + 0.5 - x0[which], rows + 0.5 - y0[which]
+        t = np.clip((px * dx + py * dy) / length, 0, 1)
+        px -= t * dx
+        py -= t * dy
+        coverage = np.clip(np.minimum(linewidth / 2 + 0.5 - np.sqrt(px * px + py * py), linewidth), 0, 1)
+        covered = coverage > 0
+        coverage, which = coverage[covered], which[covered]
+        index = (chart[which] * height + rows[covered]) * width + cols[covered]
+
+        # a pixel covered by several segments (joins) is blended once with the largest coverage
+        if self.coverage is None:
+            self.coverage = np.zeros(self.buffer.size)
+        if step:
+            bounds = np.concatenate([[0], np.cumsum(covered)])[np.concatenate([[0], np.cumsum(counts)])[groups]]
+            self.coverage[index[:bounds[1]]] = coverage[:bounds[1]]
+            for a, b in zip(bounds[1:-1], bounds[2:]):
+                self.coverage[index[a:b]] = np.maximum(self.coverage[index[a:b]], coverage[a:b])
+        else:
+            order = np.argsort(index, kind='stable')
+            first = np.flatnonzero(np.concatenate([[True], index[order][1:] != index[order][:-1]]))
+            self.coverage[index[order][first]] = np.maximum.reduceat(coverage[order], first)
+        alpha = self.coverage[index]
+        self.coverage[index] = 0
+
+        # a pixel listed twice is blended from the same value twice, so it is written once in effect
+        buffer = self.buffer.reshape(-1)
+        pixels = buffer[index]
+        blended = np.zeros_like(pixels)
+        for channel, value in enumerate(np.asarray(color, dtype=np.float64)):
+            shift = np.uint32(8 * channel)
+            blend = np.round(((pixels >> shift) & 255) * (1 - alpha) + value * alpha)
+            blended |= blend.astype(pixels.dtype) << shift
+        buffer[index] = blended
+
+
+def separation(x: np.ndarray, reach, steps=(2, 3, 4)) -> int:
+    '''
+    the smallest step that pixel columns of segment i and i + step never overlap
+    (points are in increasing x and far apart from the stroke). None if there is no such step
+    x: np.ndarray
+        [charts, n] x of points
+    '''
+    if not np.isfinite(x).all() or not (np.diff(x, axis=1) > 0).all():
+        return None
+    for step in steps:
+        if (np.ceil(x[:, 1:-step] + reach) <= np.floor(x[:, step:-1] - reach)).all():
+            return step
+    return None
+
+
+def span(lo, hi, limit):
+    '''
+    pixel index range [start, end) of [lo, hi] bounds, at least one pixel
+    '''
+    start = np.round(np.asarray(lo, dtype=np.float64))
+    end = np.maximum(np.round(np.asarray(hi, dtype=np.float64)), start + 1)
+    start = np.minimum(np.maximum(start, 0), limit).astype(np.int64)
+    end = np.minimum(np.maximum(end, 0), limit).astype(np.int64)
+    return start, end
+
+
+class ChartRaster:
+    def __init__(self, size, period, linespace, candlewidth, linewidth, style, feature: dict, color: dict) -> None:
+        '''
+        Chart setting of CandlstickChart. Colors, layout and background are resolved once
+        feature: dict
+            {'volume': bool, 'SMA': [periods], 'EMA': [periods], 'MACD': [short, long, signal]}
+        color: dict
+            {'up': color, 'down': color, 'SMA': [colors], 'EMA': [colors], 'MACD': [MACD, signal]}
+        '''
+        self.size = size
+        self.period = period
+        self.linespace = linespace
+        self.candlewidth = candlewidth
+        self.linewidth = to_pixels(linewidth)
+        self.feature = feature
+        self.blank = np.empty((size[1], size[0], 3), dtype=np.uint8)
+        self.blank[:] = background(style)
+        self.canvas = None  # reused for every batch of the same size
+        self.up = to_rgb(color.get('up'))
+        self.down = to_rgb(color.get('down'))
+        self.lines = [(f'{span}SMA', to_rgb(c)) for span, c in zip(feature.get('SMA'), color.get('SMA'))] + \
+            [(f'{span}EMA', to_rgb(c)) for span, c in zip(feature.get('EMA'), color.get('EMA'))]
+        self.MACD = [to_rgb(c) for c in color.get('MACD')]
+        self.boxes = axes_boxes(size, feature.get('volume'), feature.get('MACD'))
+        self.columns = ['Open', 'High', 'Low', 'Close'] + (['Volume'] if feature.get('volume') else []) + \
+            [column for column, _ in self.lines] + (['MACD', 'MACD_Signal'] if not 0 in feature.get('MACD') else [])
+        self.batch = max(1, (1 << 22) // (size[0] * size[1]))  # charts drawn at once (4M pixels)
+
+    def limits(self, c: pd.DataFrame) -> list:
+        '''
+        (xlim, ylim) of each subplot autoscaled to c (same as matplotlib autoscale_view)
+        c: pd.DataFrame
+            historical data and features of the chart period
+        '''
+        n = len(c)
+        t = np.arange(1, self.period * self.linespace + 1, self.linespace)[:n]
+        offset = self.candlewidth / 2
+        line_x = np.arange(1, n + 1)  # moving averages are plotted by position
+        lines = [c[column].to_numpy(dtype=np.float64) for column, _ in self.lines]
+        xs = [t - offset, t + offset] + [line_x[np.isfinite(line)] for line in lines]
+        ys = [c['Low'].to_numpy(dtype=np.float64), c['High'].to_numpy(dtype=np.float64)] + lines
+        limits = [(autoscale(np.concatenate(xs)), autoscale(np.concatenate(ys)))]
+
+        if self.feature.get('volume'):
+            volume = c['Volume'].to_numpy(dtype=np.float64)
+            limits.append((autoscale([-0.5, n - 0.5, n]), autoscale(np.concatenate([[0], volume]))))
+
+        if not 0 in self.feature.get('MACD'):
+            x = np.arange(n)
+            macd = c['MACD'].to_numpy(dtype=np.float64)
+            signal = c['MACD_Signal'].to_numpy(dtype=np.float64)
+            limits.append((
+                autoscale(np.concatenate([x[np.isfinite(macd)], x[np.isfinite(signal)]])),
+                autoscale(np.concatenate([macd, signal])),
+            ))
+        return limits
+
+    def batch_limits(self, data: pd.DataFrame, ends) -> list:
+        '''
+        limits (see limits) of every window data.iloc[end - period + 1: end + 1] at once
+        with sliding window operations
+        ends: np.ndarray
+            positions of the last candle of each window (>= period - 1)
+        '''
+        n = self.period
+        count = len(ends)
+        t = np.arange(1, self.period * self.linespace + 1, self.linespace)[:n]
+        offset = self.candlewidth / 2
+        line_x = np.arange(1, n + 1, dtype=np.float64)
+        window = lambda column: windows(data[column].to_numpy(dtype=np.float64), n, ends)
+
+        lines = [window(column) for column, _ in self.lines]
+        xs = [np.broadcast_to(np.concatenate([t - offset, t + offset]), (count, 2 * n))] + \
+            [np.where(np.isfinite(line), line_x, np.nan) for line in lines]
+        ys = [window('Low'), window('High')] + lines
+        limits = [(autoscale_rows(np.concatenate(xs, axis=1)), autoscale_rows(np.concatenate(ys, axis=1)))]
+
+        if self.feature.get('volume'):
+            xlim = autoscale_rows(np.broadcast_to([-0.5, n - 0.5, n], (count, 3)))
+            ylim = autoscale_rows(np.concatenate([np.zeros((count, 1)), window('Volume')], axis=1))
+            limits.append((xlim, ylim))
+
+        if not 0 in self.feature.get('MACD'):
+            x = np.arange(n, dtype=np.float64)
+            macd, signal = window('MACD'), window('MACD_Signal')
+            xlim = autoscale_rows(np.concatenate([
+                np.where(np.isfinite(macd), x, np.nan), np.where(np.isfinite(signal), x, np.nan)
+            ], axis=1))
+            limits.append((xlim, autoscale_rows(np.concatenate([macd, signal], axis=1))))
+
+        return [[(tuple(xlim[i]), tuple(ylim[i])) for xlim, ylim in limits] for i in range(count)]
+
+    def batch_pixels(self, data: pd.DataFrame, ends, limits: list) -> np.ndarray:
+        '''
+        pixel coordinates [len(ends), period, (Xmin, Ymin, Xmax, Ymax)] of every window at once
+        limits: list
+            limits of each window (see batch_limits)
+        '''
+        xlim = np.array([limit[0][0] for limit in limits])[:, :, None]
+        ylim = np.array([limit[0][1] for limit in limits])[:, :, None]
+        left, bottom, width, height = self.boxes[0]
+        t = np.arange(1, self.period * self.linespace + 1, self.linespace)[:self.period]
+        offset = self.candlewidth / 2
+        x = lambda v: left + (v - xlim[:, 0]) / (xlim[:, 1] - xlim[:, 0]) * width
+        y = lambda v: self.size[1] - (bottom + (v - ylim[:, 0]) / (ylim[:, 1] - ylim[:, 0]) * height)
+        high = windows(data['High'].to_numpy(dtype=np.float64), self.period, ends)
+        low = windows(data['Low'].to_numpy(dtype=np.float64), self.period, ends)
+        return np.stack([
+            np.broadcast_to(x(t - offset), high.shape), y(high),
+            np.broadcast_to(x(t + offset), high.shape), y(low),
+        ], axis=2)
+
+    def pixels(self, c: pd.DataFrame, view: Viewport=None) -> np.ndarray:
+        '''
+        pixel coordinates [period, (Xmin, Ymin, Xmax, Ymax)] of each candle, the same as matplotlib data -> display transform
+        body width and wick height in one vectorized transform
+        view: Viewport
+            candlestick subplot. If None, autoscale to c
+        '''
+        if view is None:
+            view = Viewport(self.size, self.boxes[0], *self.limits(c)[0])
+        t = np.arange(1, self.period * self.linespace + 1, self.linespace)[:len(c)]
+        offset = self.candlewidth / 2
+        high = c['High'].to_numpy(dtype=np.float64)
+        low = c['Low'].to_numpy(dtype=np.float64)
+        return np.stack([view.x(t - offset), view.y(high), view.x(t + offset), view.y(low)], axis=1)
+
+    def draw(self, c: pd.DataFrame, limits: list=None):
+        '''
+        c: pd.DataFrame
+            historical data and features of the chart period
+        limits: list
+            precomputed limits of each subplot (see batch_limits). If None, autoscale to c
+
+        return: (np.ndarray, np.ndarray)
+            uint8 RGB image [height, width, 3] and
+            pixel coordinates [period, (Xmin, Ymin, Xmax, Ymax)] of each candle (see pixels)
+        '''
+        limits = limits if limits else self.limits(c)
+        values = {column: c[column].to_numpy(dtype=np.float64)[None] for column in self.columns}
+        image = self.render(values, [limits])[0]
+        return image, self.pixels(c, Viewport(self.size, self.boxes[0], *limits[0]))
+
+    def batch_draw(self, data: pd.DataFrame, ends, limits: list) -> np.ndarray:
+        '''
+        images of every window data.iloc[end - period + 1: end + 1] (see draw). Windows are drawn batch at once
+        limits: list
+            limits of each window (see batch_limits)
+
+        return: np.ndarray
+            uint8 RGB images [len(ends), height, width, 3]
+        '''
+        ends = np.asarray(ends)
+        columns = {column: data[column].to_numpy(dtype=np.float64) for column in self.columns}
+        images = np.empty((len(ends), self.size[1], self.size[0], 3), dtype=np.uint8)
+        for i in range(0, len(ends), self.batch):
+            batch = slice(i, i + self.batch)
+            values = {column: windows(v, self.period, ends[batch]) for column, v in columns.items()}
+            images[batch] = self.render(values, limits[batch])
+        return images
+
+    def render(self, values: dict, limits: list) -> np.ndarray:
+        '''
+        draw charts at once
+        values: dict
+            {column: [charts, n]} historical data and features of each chart
+        limits: list
+            limits of each chart (see limits)
+
+        return: np.ndarray
+            uint8 RGB images [charts, height, width, 3]
+        '''
+        limits = np.asarray(limits, dtype=np.float64)  # [charts, subplots, (xlim, ylim), (min, max)]
+        if self.canvas is None or len(self.canvas.buffer) != len(limits):
+            self.canvas = Canvas(self.blank, len(limits))
+        else:
+            self.canvas.clear()
+        canvas = self.canvas
+        views = [Viewport(self.size, box, limits[:, i, 0], limits[:, i, 1]) for i, box in enumerate(self.boxes)]
+        open, close, high, low = values['Open'], values['Close'], values['High'], values['Low']
+        n = open.shape[1]
+        colors = np.where((close >= open)[..., None], self.up, self.down)
+
+        # candlestick and moving averages
+        view = views[0]
+        t = np.arange(1, self.period * self.linespace + 1, self.linespace)[:n]
+        offset = self.candlewidth / 2
+        edge = to_pixels(EDGE_WIDTH) / 2
+        canvas.rectangles(
+            view.x(t - offset) - edge, view.x(t + offset) + edge,
+            view.y(np.maximum(open, close)) - edge, view.y(np.minimum(open, close)) + edge,
+            colors,
+        )
+        wick = to_pixels(WICK_WIDTH) / 2
+        x, bottom = np.broadcast_arrays(view.x(t), view.y(low))
+        canvas.rectangles(x - wick, x + wick, view.y(high), bottom, colors)
+        line_x = np.arange(1, n + 1)
+        for column, color in self.lines:
+            canvas.polyline(view.x(line_x), view.y(values[column]), self.linewidth, color)
+
+        if self.feature.get('volume'):
+            bars = views[1]
+            volume = values['Volume']
+            x = np.arange(n)
+            x0, x1, y0, y1 = np.broadcast_arrays(bars.x(x - 0.5), bars.x(x + 0.5), bars.y(volume), bars.y(np.zeros(n)))
+            edge = to_pixels(VOLUME_EDGE_WIDTH) / 2
+            canvas.rectangles(x0 - edge, x1 + edge, y0 - edge, y1 + edge, np.where((open < close)[..., None], self.up, self.down))
+            black = np.zeros(3, dtype=np.uint8)
+            canvas.rectangles(x0 - edge, x0 + edge, y0 - edge, y1 + edge, black)
+            canvas.rectangles(x1 - edge, x1 + edge, y0 - edge, y1 + edge, black)
+            canvas.rectangles(x0 - edge, x1 + edge, y0 - edge, y0 + edge, black)
+            canvas.rectangles(x0 - edge, x1 + edge, y1 - edge, y1 + edge, black)
+
+        if not 0 in self.feature.get('MACD'):
+            view = views[-1]
+            x = np.arange(n)
+            for column, color in zip(['MACD', 'MACD_Signal'], self.MACD):
+                canvas.polyline(view.x(x), view.y(values[column]), to_pixels(MACD_WIDTH), color)
+
+        return canvas.images
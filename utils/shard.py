@@ -0,0 +1,155 @@
+'''
+WebDataset-style tar shards of chart samples
+
+Each sample is stored as tar members {key}.{member} (ex. 000020_2022-12-01.png, 000020_2022-12-01.pixels.csv,
+000020_2022-12-01.json), so shards can be streamed by tar readers in order.
+Each shard has an index ({shard}.index.csv: Key, Member, Offset, Size) for random access by key.
+'''
+from pathlib import Path
+import tarfile
+import time
+import io
+import os
+import pandas as pd
+
+
+class ShardWriter:
+    def __init__(self, path: Path, prefix=None, max_count=10000, max_size=1 << 30) -> None:
+        '''
+        path: pathlib.Path
+            directory of shards
+        prefix: str
+            prefix of shard names. If None, process id (every process writes its own shards)
+        max_count: int
+            the number of samples in a shard
+        max_size: int
+            bytes of a shard
+        '''
+        self.path = path
+        self.path.mkdir(parents=True, exist_ok=True)
+        self.prefix = prefix if prefix else str(os.getpid())
+        self.max_count = max_count
+        self.max_size = max_size
+        self.number = 0
+        self.count = 0
+        self.tar = None
+        self.index = None
+
+    def open(self):
+        '''
+        Open next shard which does not exist
+        '''
+        while (self.path / f'{self.prefix}-{self.number:05d}.tar').exists():
+            self.number += 1
+        name = f'{self.prefix}-{self.number:05d}'
+        self.tar = tarfile.open(self.path / f'{name}.tar', 'w')
+        self.index = open(self.path / f'{name}.index.csv', 'w')
+        self.index.write('Key,Member,Offset,Size\n')
+        self.count = 0
+
+    def write(self, key, members: dict):
+        '''
+        key: str
+            key of sample (ex. {ticker}_{last_date})
+        members: dict
+            {member: bytes} (ex. {'png': image, 'pixels.csv': pixel coordinates})
+        '''
+        if self.tar is None or self.count >= self.max_count or self.tar.offset >= self.max_size:
+            self.close()
+            self.open()
+
+        for member, data in members.items():
+            info = tarfile.TarInfo(f'{key}.{member}')
+            info.size = len(data)
+            info.mtime = int(time.time())
+            self.tar.addfile(info, io.BytesIO(data))
+            offset = self.tar.offset - -(-info.size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE  # data follows header
+            self.index.write(f'{key},{member},{offset},{info.size}\n')
+        self.tar.fileobj.flush()
+        self.index.flush()
+        self.count += 1
+
+    def close(self):
+        if self.tar is not None:
+            self.tar.close()
+            self.index.close()
+            self.tar = None
+            self.index = None
+
+
+class ShardReader:
+    def __init__(self, path: Path) -> None:
+        '''
+        Random access to samples of shards in path by key
+        If a key is written more than once, the latest shard is used
+        '''
+        self.path = path
+        self.index = dict()
+        self.stats = dict()  # {index file name: (mtime, size)} when it was read
+        self.load()
+
+    def load(self):
+        '''
+        Read index files which are new or changed since the last load
+        '''
+        files = []
+        for file in self.path.glob('*.index.csv'):
+            stat = file.stat()
+            if self.stats.get(file.name) != (stat.st_mtime_ns, stat.st_size):
+                files.append((stat.st_mtime_ns, stat.st_size, file))
+        for mtime, size, file in sorted(files, key=lambda f: f[0]):  # latest shard last
+            index = pd.read_csv(file, dtype={'Key': str, 'Member': str})
+            shard = file.name[:-len('.index.csv')] + '.tar'
+            self.index.update({
+                (key, member): (shard, offset, size)
+                for key, member, offset, size in index[['Key', 'Member', 'Offset', 'Size']].itertuples(index=False)
+            })
+            self.stats[file.name] = (mtime, size)
+        return self
+
+    def __contains__(self, item) -> bool:
+        '''
+        item: (key, member)
+        '''
+        return item in self.index
+
+    def locate(self, key, member) -> tuple:
+        '''
+        (shard, offset, size) of the sample member. FileNotFoundError if it is not in shards
+        Index files are reloaded at most once, only when a sample is not found
+        '''
+        if (key, member) not in self.index:
+            self.load()  # written after loading index
+        try:
+            return self.index[(key, member)]
+        except KeyError:
+            raise FileNotFoundError(f'{key}.{member} is not in {self.path}')
+
+    def read(self, key, member) -> bytes:
+        '''
+        bytes of the sample member. FileNotFoundError if it is not in shards
+        '''
+        shard, offset, size = self.locate(key, member)
+        with open(self.path / shard, 'rb') as f:
+            f.seek(offset)
+            return f.read(size)
+
+
+shard_writers = dict()  # shard writers of this process
+def shard_writer(path: Path) -> ShardWriter:
+    '''
+    ShardWriter of the directory in this process
+    '''
+    key = (str(path), os.getpid())
+    if key not in shard_writers:
+        shard_writers[key] = ShardWriter(path)
+    return shard_writers[key]
+
+
+def close_shards():
+    '''
+    Close every shard writer of this process
+    '''
+    for writer in shard_writers.values():
+        writer.close()
+    shard_writers.clear()
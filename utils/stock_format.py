@@ -2,6 +2,7 @@ from datetime import datetime
 from Data.utils import dataframe_empty_handler
 import numpy as np
 import pandas as pd
+from pandas.api.types import is_datetime64_any_dtype
 from typing import List
 
 
@@ -12,37 +13,48 @@ def convert_format(stock: pd.DataFrame, date_format: str):
     date_format: format of Date column
     '''
     column = ['Date', 'Open', 'Close', 'High', 'Low', 'Volume']
-    # Delete useless column
-    delete_col = set(stock.columns) - set(column)
-    for i in delete_col:
-        del stock[i]
+    # select useful column
+    stock = stock[[col for col in stock.columns if col in column]]
 
-    # convert Date format to %Y-%m-%d
-    stock.Date = stock.Date.map(lambda x: convert_date_format(x, date_format))
+    # parse Date once (datetime64)
+    date = stock['Date']
+    if not is_datetime64_any_dtype(date):
+        date = pd.to_datetime(date.astype(str), format=date_format)
 
-    # remove 0 and set Date as index
-    stock.replace(0, np.NaN, inplace=True)
-    stock.dropna(inplace=True)
-    stock.set_index('Date', inplace=True)
+    # remove 0 and NaN
+    values = stock.drop(columns='Date')
+    valid = ((values != 0) & values.notna()).all(axis=1) & date.notna()
+    stock = values[valid]
+
+    # set Date (%Y-%m-%d) as index
+    date = date[valid].to_numpy(dtype='datetime64[D]')
+    stock.index = pd.Index(np.datetime_as_string(date, unit='D'), name='Date')
     return stock
 
 
 @dataframe_empty_handler
-def convert_feature_format(stock: pd.DataFrame, volume: bool, SMA: List[str], EMA: List[str], MACD=List[int]):
-
+def convert_feature_format(stock: pd.DataFrame, volume: bool, SMA: List[str], EMA: List[str], MACD=List[int], features: pd.DataFrame=None):
+    '''
+    features: pd.DataFrame
+        precomputed SMA, EMA, MACD columns (see FeatureStore). If None, compute them
+    '''
     if not volume:
         del stock['Volume']
-        
-    for span in SMA:
-        stock[f'{span}SMA'] = stock['Close'].rolling(span).mean()
-    for span in EMA:
-        stock[f'{span}EMA'] = stock['Close'].ewm(span=span).mean()
-
-    if not 0 in MACD:
-        ema_short = stock['Close'].ewm(span=MACD[0]).mean()
-        ema_long = stock['Close'].ewm(span=MACD[1]).mean()
-        stock['MACD'] = ema_short - ema_long
-        stock['MACD_Signal'] = stock['MACD'].ewm(span=MACD[2]).mean()
+    
+    if features is not None:
+        for column in features.columns:
+            stock[column] = features[column]
+    else:
+        for span in SMA:
+            stock[f'{span}SMA'] = stock['Close'].rolling(span).mean()
+        for span in EMA:
+            stock[f'{span}EMA'] = stock['Close'].ewm(span=span).mean()
+
+        if not 0 in MACD:
+            ema_short = stock['Close'].ewm(span=MACD[0]).mean()
+            ema_long = stock['Close'].ewm(span=MACD[1]).mean()
+            stock['MACD'] = ema_short - ema_long
+            stock['MACD_Signal'] = stock['MACD'].ewm(span=MACD[2]).mean()
     
     # remove 0 and set Date as index
     stock.replace(0, np.NaN, inplace=True)
@@ -54,4 +66,72 @@ def convert_date_format(date, date_format):
     date = str(date)
     date_time = datetime.strptime(date, date_format)
     date = date_time.strftime("%Y-%m-%d")
-    return date
\ No newline at end of file
+    return date
+
+PRICE_COLUMNS = ['Open', 'High', 'Low', 'Close']
+stock_formats = ['npz', 'parquet', 'csv']  # priority when format is not given
+
+
+def save_stock(stock: pd.DataFrame, path):
+    '''
+    Save historical data in the format of path suffix (csv / npz / parquet)
+    '''
+    fmt = path.suffix[1:]
+    if fmt == 'npz':
+        save_npz(stock, path)
+    elif fmt == 'parquet':
+        save_parquet(stock, path)
+    else:
+        stock.to_csv(path)
+
+
+def load_stock(path) -> pd.DataFrame:
+    '''
+    Load historical data in the format of path suffix (csv / npz / parquet)
+    '''
+    fmt = path.suffix[1:]
+    if fmt == 'npz':
+        return load_npz(path)
+    elif fmt == 'parquet':
+        return load_parquet(path)
+    return pd.read_csv(path, index_col='Date', engine='python', error_bad_lines=False)
+
+
+def save_npz(stock: pd.DataFrame, path):
+    '''
+    Save historical data as uncompressed numpy arrays
+    stock: stock historical data (Date index of %Y-%m-%d)
+    path: path of .npz file
+
+    Date is stored as datetime64[D], prices as float32 and Volume as int64
+    '''
+    columns = {col: stock[col].to_numpy(dtype=np.float32) for col in PRICE_COLUMNS}
+    columns['Volume'] = stock['Volume'].to_numpy(dtype=np.int64)
+    with open(path, 'wb') as f:
+        np.savez(f, Date=np.array(stock.index, dtype='datetime64[D]'), **columns)
+
+
+def load_npz(path) -> pd.DataFrame:
+    '''
+    Load historical data saved by save_npz
+    '''
+    with np.load(path) as npz:
+        date = pd.Index(np.datetime_as_string(npz['Date'], unit='D'), name='Date')
+        columns = {col: npz[col] for col in PRICE_COLUMNS + ['Volume']}
+    return pd.DataFrame(columns, index=date)
+
+
+def save_parquet(stock: pd.DataFrame, path):
+    '''
+    Save historical data as parquet (pyarrow is required)
+    '''
+    dtypes = {col: np.float32 for col in PRICE_COLUMNS}
+    dtypes['Volume'] = np.int64
+    stock.astype(dtypes).to_parquet(path)
+
+
+def load_parquet(path) -> pd.DataFrame:
+    '''
+    Load historical data saved by save_parquet
+    '''
+    return pd.read_parquet(path)
@@ -0,0 +1,73 @@
+import weakref
+import numpy as np
+import pandas as pd
+
+
+class TradingDates:
+    def __init__(self, dates) -> None:
+        '''
+        Sorted trade dates with position <-> date lookup
+        dates: list or pd.Index
+            sorted trade dates (%Y-%m-%d)
+
+        labels: np.ndarray
+            trade dates (%Y-%m-%d)
+        values: np.ndarray
+            trade dates (datetime64[D])
+        '''
+        self.labels = np.asarray(dates, dtype='U10')
+        self.values = self.labels.astype('datetime64[D]')
+        self.positions = {date: i for i, date in enumerate(self.labels.tolist())}
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def position(self, date) -> int:
+        '''
+        position of the trade date. KeyError if it is not a trade date
+        '''
+        return self.positions[date]
+
+    def date(self, position) -> str:
+        return str(self.labels[position])
+
+    def search(self, date) -> int:
+        '''
+        position of the first trade date >= date
+        '''
+        return int(np.searchsorted(self.values, np.datetime64(date, 'D')))
+
+    def between(self, start='2006', end='a') -> range:
+        '''
+        positions of trade dates that start <= date < end
+        start and end are compared as string (ex. '2006' <= '2006-01-02' < 'a')
+        '''
+        i = np.searchsorted(self.labels, start, side='left')
+        j = np.searchsorted(self.labels, end, side='left')
+        return range(int(i), int(max(i, j)))
+
+    def window(self, last_date, period):
+        '''
+        [start, end) positions of period trade dates ending at last_date
+        None if there are not enough trade dates
+        '''
+        end = self.position(last_date) + 1
+        start = end - period
+        if start < 0:
+            return None
+        return start, end
+
+
+cached_dates = dict()  # id(index) -> (weak reference of index, TradingDates)
+def trading_dates(index: pd.Index) -> TradingDates:
+    '''
+    TradingDates of the index. It is made once while the index is alive
+    '''
+    key = id(index)
+    cached = cached_dates.get(key)
+    if cached is not None and cached[0]() is index:
+        return cached[1]
+    dates = TradingDates(index)
+    reference = weakref.ref(index, lambda _, key=key: cached_dates.pop(key, None))
+    cached_dates[key] = (reference, dates)
+    return dates